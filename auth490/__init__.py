@@ -1,8 +1,12 @@
 from .authority import Authority, AuthorityApproval, AuthorityRequest
-from .crypto import RSAPrivateKey, RSAPublicKey, PrivateKey, PublicKey, KeyHolder
+from .crypto import RSAPrivateKey, RSAPublicKey, Ed25519PrivateKey, Ed25519PublicKey, P256PrivateKey, P256PublicKey, PrivateKey, PublicKey, KeyHolder, verify_many, sign_all
 from .data import Data, DataRequest, DataTransfer, DataType
 from .individual import Individual
+from .merkle import MerkleTree, MembershipProof, RegistryCommitment
+from .pool import KeyPool
 from .permission import PermissionType, PermissionRequest, PermissionApproval
-from .registry import Registry
-from .serialize import deserialize
+from .registry import Registry, KeyHolderResolver
+from .revocation import Revocation, RevocationList
+from .store import RegistryStore, WalletStore, MemoryWalletStore, SQLiteWalletStore
+from .serialize import deserialize, registered_types
 from .wallet import Wallet
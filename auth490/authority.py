@@ -1,7 +1,8 @@
-from typing import Union
+from typing import Union, Iterator
 
 from .payload import Request, Approval
-from .crypto import KeyHolder, Signable, Signature, PublicKey
+from .crypto import KeyHolder, Signable, Signature, PublicKey, SignatureJob
+from .serialize import cls_deserialize
 
 class Authority(KeyHolder):
     __name: str
@@ -62,14 +63,15 @@ class AuthorityRequest(Request):
     def raw_deserialize(cls, data: dict) -> "AuthorityRequest":
         request = AuthorityRequest(
             requester=KeyHolder.raw_deserialize(data["r"]),
-            authority=Authority.raw_deserialize(data["d"])
+            authority=cls_deserialize(Authority, data["d"])
         )
         request.try_add_sign(data)
 
         return request
 
-    def validate(self) -> bool:
-        return self.authority.validate() and super().validate()
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield from self.authority.signature_jobs()
+        yield from super().signature_jobs()
 
 class AuthorityApproval(Approval):
     __request: AuthorityRequest
@@ -0,0 +1,213 @@
+import base64
+import struct
+import zlib
+from .dictionaries import DICTIONARIES
+from typing import Tuple
+
+# Append-only: the position of a type code is its wire value.
+TYPE_CODES = ["s", "k", "pk", "a", "ar", "aa", "d", "dt", "dr", "u", "pr", "pa", "w", "rv", "rc", "mp"]
+TYPE_IDS = {code: i for i, code in enumerate(TYPE_CODES)}
+
+# Fields whose string values are urlsafe base64 and travel as raw bytes.
+BYTES_FIELDS = ("k", "s")
+
+RAW = 0
+ZLIB = 1
+
+# Number of decimal digits used for a chunk of 0..7 bytes.
+CHUNK_BYTES = 7
+CHUNK_DIGITS = [0, 3, 5, 8, 10, 13, 15, 17]
+DIGITS_CHUNK = {digits: size for size, digits in enumerate(CHUNK_DIGITS)}
+
+def deflate(data: bytes, dictionary: int = None) -> bytes:
+    if dictionary is None:
+        return zlib.compress(data)
+
+    compressor = zlib.compressobj(level=9, zdict=DICTIONARIES[dictionary])
+
+    return compressor.compress(data) + compressor.flush()
+
+def inflate(data: bytes, dictionary: int = None) -> bytes:
+    if dictionary is None:
+        return zlib.decompress(data)
+
+    decompressor = zlib.decompressobj(zdict=DICTIONARIES[dictionary])
+
+    return decompressor.decompress(data) + decompressor.flush()
+
+def to_digits(data: bytes) -> str:
+    chunks = []
+
+    for i in range(0, len(data), CHUNK_BYTES):
+        chunk = data[i:i + CHUNK_BYTES]
+        chunks.append(str(int.from_bytes(chunk, byteorder='big')).zfill(CHUNK_DIGITS[len(chunk)]))
+
+    return ''.join(chunks)
+
+def from_digits(digits: str) -> bytes:
+    full, remainder = divmod(len(digits), CHUNK_DIGITS[CHUNK_BYTES])
+
+    if not remainder in DIGITS_CHUNK:
+        raise Exception("Invalid binary digit length.")
+
+    data = bytearray()
+    size = CHUNK_DIGITS[CHUNK_BYTES]
+
+    for i in range(full):
+        data += int(digits[i * size:(i + 1) * size]).to_bytes(CHUNK_BYTES, byteorder='big')
+
+    if remainder:
+        data += int(digits[full * size:]).to_bytes(DIGITS_CHUNK[remainder], byteorder='big')
+
+    return bytes(data)
+
+def _head(out: bytearray, major: int, value: int):
+    if value < 24:
+        out.append(major << 5 | value)
+    elif value < 0x100:
+        out.append(major << 5 | 24)
+        out.append(value)
+    elif value < 0x10000:
+        out.append(major << 5 | 25)
+        out += struct.pack(">H", value)
+    elif value < 0x100000000:
+        out.append(major << 5 | 26)
+        out += struct.pack(">I", value)
+    else:
+        out.append(major << 5 | 27)
+        out += struct.pack(">Q", value)
+
+def _encode(out: bytearray, value: any):
+    if value is None:
+        out.append(0xf6)
+    elif value is True:
+        out.append(0xf5)
+    elif value is False:
+        out.append(0xf4)
+    elif isinstance(value, int):
+        if value >= 0:
+            _head(out, 0, value)
+        else:
+            _head(out, 1, -1 - value)
+    elif isinstance(value, bytes):
+        _head(out, 2, len(value))
+        out += value
+    elif isinstance(value, str):
+        encoded = value.encode()
+        _head(out, 3, len(encoded))
+        out += encoded
+    elif isinstance(value, list):
+        _head(out, 4, len(value))
+        for item in value:
+            _encode(out, item)
+    elif isinstance(value, dict):
+        _head(out, 5, len(value))
+        for k, v in value.items():
+            _encode(out, k)
+
+            if k == "t" and isinstance(v, str):
+                v = TYPE_IDS[v]
+            elif k in BYTES_FIELDS and isinstance(v, str):
+                v = base64.urlsafe_b64decode(v)
+
+            _encode(out, v)
+    else:
+        raise Exception("Cannot binary encode " + value.__class__.__name__)
+
+def _read_head(data: bytes, i: int) -> Tuple[int, int, int]:
+    initial = data[i]
+    major, additional = initial >> 5, initial & 0x1f
+    i += 1
+
+    if additional < 24:
+        return major, additional, i
+    elif additional == 24:
+        return major, data[i], i + 1
+    elif additional == 25:
+        return major, struct.unpack_from(">H", data, i)[0], i + 2
+    elif additional == 26:
+        return major, struct.unpack_from(">I", data, i)[0], i + 4
+    elif additional == 27:
+        return major, struct.unpack_from(">Q", data, i)[0], i + 8
+
+    raise Exception("Invalid binary header.")
+
+def _decode(data: bytes, i: int) -> Tuple[any, int]:
+    major, value, i = _read_head(data, i)
+
+    if major == 0:
+        return value, i
+    elif major == 1:
+        return -1 - value, i
+    elif major == 2:
+        return base64.urlsafe_b64encode(data[i:i + value]).decode(), i + value
+    elif major == 3:
+        return data[i:i + value].decode(), i + value
+    elif major == 4:
+        items = []
+        for _ in range(value):
+            item, i = _decode(data, i)
+            items.append(item)
+        return items, i
+    elif major == 5:
+        items = {}
+        for _ in range(value):
+            k, i = _decode(data, i)
+            v, i = _decode(data, i)
+
+            if k == "t" and isinstance(v, int):
+                v = TYPE_CODES[v]
+
+            items[k] = v
+        return items, i
+    elif major == 7:
+        if value == 20:
+            return False, i
+        elif value == 21:
+            return True, i
+        elif value == 22:
+            return None, i
+
+    raise Exception("Invalid binary value.")
+
+def encode(value: any) -> bytes:
+    out = bytearray()
+
+    if isinstance(value, str):
+        # Keys serialize to a bare base64 string.
+        value = base64.urlsafe_b64decode(value)
+
+    _encode(out, value)
+
+    return bytes(out)
+
+def decode(data: bytes) -> any:
+    value, i = _decode(data, 0)
+
+    if not i == len(data):
+        raise Exception("Trailing binary data.")
+
+    return value
+
+def pack(value: any, dictionary: int = None) -> bytes:
+    encoded = encode(value)
+
+    if dictionary is None:
+        compressed = zlib.compress(encoded, 9)
+    else:
+        compressed = deflate(encoded, dictionary)
+
+    if len(compressed) < len(encoded):
+        return bytes([ZLIB]) + compressed
+
+    return bytes([RAW]) + encoded
+
+def unpack(data: bytes, dictionary: int = None) -> any:
+    flag, body = data[0], data[1:]
+
+    if flag == ZLIB:
+        body = inflate(body, dictionary)
+    elif not flag == RAW:
+        raise Exception("Unknown binary flag.")
+
+    return decode(body)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable
+
+class LRUCache:
+    __entries: OrderedDict
+    __maxsize: int
+    __lock: Lock
+
+    def __init__(self, maxsize: int = 1024):
+        self.__entries = OrderedDict()
+        self.__maxsize = maxsize
+        self.__lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self.__maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int):
+        with self.__lock:
+            self.__maxsize = maxsize
+            self.__evict()
+
+    def get(self, key: Hashable, default: any = None) -> any:
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return self.__entries[key]
+
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: any):
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            self.__evict()
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __evict(self):
+        while len(self.__entries) > max(self.__maxsize, 0):
+            self.__entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.__entries),
+            "maxsize": self.__maxsize
+        }
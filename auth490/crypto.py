@@ -1,16 +1,35 @@
 from dataclasses import dataclass
 import base64
 import json
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
+from Crypto.PublicKey import RSA, ECC
+from Crypto.Signature import pkcs1_15, eddsa, DSS
 from Crypto.Hash import SHA256
 from abc import ABC, abstractmethod, abstractclassmethod
-from typing import Union
+from concurrent.futures import Executor, ProcessPoolExecutor
+from threading import Lock
+from typing import Union, Iterator, Tuple, List, Iterable, Callable, Dict
+import hashlib
+import math
+import multiprocessing
+import os
+import time
 import zlib
 import re
-from .serialize import Serializable, cls_deserialize
+from .cache import LRUCache
+from .pool import KeyPool
+from .serialize import Serializable, cls_deserialize, compress
 from typing import Union
 
+verified_signatures = LRUCache(maxsize=4096)
+constructed_keys = LRUCache(maxsize=1024)
+
+# RSA keys are untagged, their encoding starts with the modulus' top byte (>= 0x80).
+KEY_TYPE_ED25519 = 1
+KEY_TYPE_P256 = 2
+
+def get_key_type(data: str) -> int:
+    return base64.urlsafe_b64decode(data[:4])[0]
+
 class Signature(Serializable):
     __value: bytes
 
@@ -69,6 +88,10 @@ class Key(Serializable, Validator, ABC):
     def public_key(self) -> "PublicKey":
         pass
 
+    @property
+    def fingerprint(self) -> str:
+        return self.public_key.fingerprint
+
     def __eq__(self, other: any) -> bool:
         if not isinstance(other.public_key, self.public_key.__class__): 
             return False
@@ -76,44 +99,74 @@ class Key(Serializable, Validator, ABC):
         return self.public_key.to_b64() == other.public_key.to_b64()
 
 class PublicKey(Key, ABC):
+    __fingerprint: str = None
+
     @classmethod
     def get_type(cls) -> str:
         return "k"
 
     @classmethod
     def raw_deserialize(cls, data: dict) -> "PublicKey":
-        # TODO: Check key type.
-        return RSAPublicKey.raw_deserialize(data)
+        return public_key_types.get(get_key_type(data), RSAPublicKey).raw_deserialize(data)
 
     @property
     def public_key(self) -> "PublicKey":
         return self
 
+    @property
+    def fingerprint(self) -> str:
+        if self.__fingerprint is None:
+            self.__fingerprint = hashlib.sha256(self.to_b64().encode()).hexdigest()
+
+        return self.__fingerprint
+
+    def get_validate(self, data: bytes, signature: Signature) -> bool:
+        if data == None or signature == None or signature.raw == None:
+            return False
+
+        key = (self.fingerprint, hashlib.sha256(data).digest(), signature.raw)
+        if verified_signatures.get(key):
+            return True
+
+        if not self._verify(data, signature):
+            return False
+
+        verified_signatures.put(key, True)
+        return True
+
+    @abstractmethod
+    def _verify(self, data: bytes, signature: Signature) -> bool:
+        pass
+
 class RSAPublicKey(PublicKey):
     __public_key: any
+    __b64: str = None
 
     def __init__(self, public_key: any):
         self.__public_key = public_key
 
     def to_b64(self) -> str:
-        n = self.__public_key.n.to_bytes(128, byteorder='big')
+        if self.__b64 is None:
+            n = self.__public_key.n.to_bytes(128, byteorder='big')
+            self.__b64 = base64.urlsafe_b64encode(n).decode()
 
-        return base64.urlsafe_b64encode(n).decode()
+        return self.__b64
 
     @classmethod
     def raw_deserialize(cls, data: dict) -> 'RSAPublicKey':
-        n = int.from_bytes(base64.urlsafe_b64decode(data), byteorder='big')
-        
-        public_key = RSA.construct((n, 65537))
+        public_key = constructed_keys.get(("k", data))
+
+        if public_key is None:
+            n = int.from_bytes(base64.urlsafe_b64decode(data), byteorder='big')
+
+            public_key = RSA.construct((n, 65537))
+            constructed_keys.put(("k", data), public_key)
 
         return RSAPublicKey(
             public_key=public_key
         )
 
-    def get_validate(self, data: bytes, signature: Signature) -> bool:
-        if data == None or signature == None:
-            return False
-
+    def _verify(self, data: bytes, signature: Signature) -> bool:
         try:
             pkcs1_15.new(self.__public_key).verify(SHA256.new(data), signature.raw)
             return True
@@ -142,44 +195,77 @@ class PrivateKey(Key, Signer, ABC):
 
     @classmethod
     def raw_deserialize(cls, data: dict) -> "PrivateKey":
-        # TODO: Check key type.
-        return RSAPrivateKey.raw_deserialize(data)
+        return private_key_types.get(get_key_type(data), RSAPrivateKey).raw_deserialize(data)
 
     def get_validate(self, data: bytes, signature: Signature) -> bool:
         return self.public_key.get_validate(data, signature)
 
 class RSAPrivateKey(PrivateKey):
     __key_pair: any
+    __public_key: RSAPublicKey = None
+
+    pool: KeyPool = None
 
     def __init__(self, key_pair: any):
         self.__key_pair = key_pair
 
     @classmethod
     def generate(cls) -> "RSAPrivateKey":
+        if cls.pool is not None:
+            key = cls.pool.take()
+
+            if key is not None:
+                return key
+
+        return cls.generate_now()
+
+    @classmethod
+    def generate_now(cls) -> "RSAPrivateKey":
         return RSAPrivateKey(
             key_pair=RSA.generate(1024)
         )
 
     @property
     def public_key(self) -> RSAPublicKey:
-        return RSAPublicKey(
-            public_key=self.__key_pair.public_key()
-        )
+        if self.__public_key is None:
+            self.__public_key = RSAPublicKey(
+                public_key=self.__key_pair.public_key()
+            )
+
+        return self.__public_key
 
     def to_b64(self) -> str:
         n = self.__key_pair.n.to_bytes(128, byteorder='big')
         d = self.__key_pair.d.to_bytes(128, byteorder='big')
+        p = self.__key_pair.p.to_bytes(64, byteorder='big')
+        q = self.__key_pair.q.to_bytes(64, byteorder='big')
 
-        return base64.urlsafe_b64encode(n + d).decode()
+        return base64.urlsafe_b64encode(n + d + p + q).decode()
 
     @classmethod
     def raw_deserialize(cls, data: dict) -> "RSAPrivateKey":
-        b = base64.urlsafe_b64decode(data)
+        private_key = constructed_keys.get(("pk", data))
+
+        if private_key is None:
+            b = base64.urlsafe_b64decode(data)
+
+            n = int.from_bytes(b[:128], byteorder='big')
+            d = int.from_bytes(b[128:256], byteorder='big')
+
+            if len(b) == 384:
+                # CRT encoding: n || d || p || q.
+                p = int.from_bytes(b[256:320], byteorder='big')
+                q = int.from_bytes(b[320:], byteorder='big')
+
+                if not p * q == n:
+                    raise ValueError("Invalid RSA private key.")
 
-        n = int.from_bytes(b[:128], byteorder='big')
-        d = int.from_bytes(b[128:], byteorder='big')
+                private_key = RSA.construct((n, 65537, d, p, q), consistency_check=False)
+            else:
+                # Legacy encoding: n || d, p and q are recovered by factoring.
+                private_key = RSA.construct((n, 65537, d), consistency_check=False)
 
-        private_key = RSA.construct((n, 65537, d))
+            constructed_keys.put(("pk", data), private_key)
 
         return RSAPrivateKey(
             key_pair=private_key
@@ -200,17 +286,256 @@ class RSAPrivateKey(PrivateKey):
             **super().str_data()
         }
 
-class Signable(Serializable, ABC):
-    signature: Signature = Signature()
+class ECCPublicKey(PublicKey, ABC):
+    __public_key: any
+    __b64: str = None
+
+    key_type: int
+    curve: str
+
+    def __init__(self, public_key: any):
+        self.__public_key = public_key
+
+    @property
+    def ecc_key(self) -> any:
+        return self.__public_key
+
+    @abstractmethod
+    def to_bytes(self) -> bytes:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def import_key(cls, data: bytes) -> any:
+        pass
+
+    def to_b64(self) -> str:
+        if self.__b64 is None:
+            self.__b64 = base64.urlsafe_b64encode(bytes([self.key_type]) + self.to_bytes()).decode()
+
+        return self.__b64
+
+    @classmethod
+    def raw_deserialize(cls, data: dict) -> "ECCPublicKey":
+        public_key = constructed_keys.get(("k", data))
+
+        if public_key is None:
+            public_key = cls.import_key(base64.urlsafe_b64decode(data)[1:])
+            constructed_keys.put(("k", data), public_key)
+
+        return cls(
+            public_key=public_key
+        )
+
+    def str_data(self) -> dict:
+        return {
+            "curve": self.curve,
+            "x": self.to_bytes().hex(),
+            **super().str_data()
+        }
+
+class Ed25519PublicKey(ECCPublicKey):
+    key_type = KEY_TYPE_ED25519
+    curve = "Ed25519"
+
+    def to_bytes(self) -> bytes:
+        return self.ecc_key.export_key(format="raw")
+
+    @classmethod
+    def import_key(cls, data: bytes) -> any:
+        return eddsa.import_public_key(data)
+
+    def _verify(self, data: bytes, signature: Signature) -> bool:
+        try:
+            eddsa.new(self.ecc_key, "rfc8032").verify(data, signature.raw)
+            return True
+        except (ValueError, TypeError):
+            return False
 
+class P256PublicKey(ECCPublicKey):
+    key_type = KEY_TYPE_P256
+    curve = "P-256"
+
+    def to_bytes(self) -> bytes:
+        return self.ecc_key.export_key(format="SEC1", compress=True)
+
+    @classmethod
+    def import_key(cls, data: bytes) -> any:
+        return ECC.import_key(data, curve_name=cls.curve)
+
+    def _verify(self, data: bytes, signature: Signature) -> bool:
+        try:
+            DSS.new(self.ecc_key, "deterministic-rfc6979").verify(SHA256.new(data), signature.raw)
+            return True
+        except (ValueError, TypeError):
+            return False
+
+class ECCPrivateKey(PrivateKey, ABC):
+    __private_key: any
+    __public_key: ECCPublicKey = None
+
+    key_type: int
+    public_key_type: type
+
+    def __init__(self, private_key: any):
+        self.__private_key = private_key
+
+    @property
+    def ecc_key(self) -> any:
+        return self.__private_key
+
+    @abstractmethod
+    def to_bytes(self) -> bytes:
+        pass
+
+    @classmethod
     @abstractmethod
+    def import_key(cls, data: bytes) -> any:
+        pass
+
+    @classmethod
+    def generate(cls) -> "ECCPrivateKey":
+        return cls(
+            private_key=ECC.generate(curve=cls.public_key_type.curve)
+        )
+
+    @property
+    def public_key(self) -> ECCPublicKey:
+        if self.__public_key is None:
+            self.__public_key = self.public_key_type(
+                public_key=self.__private_key.public_key()
+            )
+
+        return self.__public_key
+
+    def to_b64(self) -> str:
+        return base64.urlsafe_b64encode(bytes([self.key_type]) + self.to_bytes()).decode()
+
+    @classmethod
+    def raw_deserialize(cls, data: dict) -> "ECCPrivateKey":
+        private_key = constructed_keys.get(("pk", data))
+
+        if private_key is None:
+            private_key = cls.import_key(base64.urlsafe_b64decode(data)[1:])
+            constructed_keys.put(("pk", data), private_key)
+
+        return cls(
+            private_key=private_key
+        )
+
+    def str_data(self) -> dict:
+        return {
+            "curve": self.public_key_type.curve,
+            **super().str_data()
+        }
+
+class Ed25519PrivateKey(ECCPrivateKey):
+    key_type = KEY_TYPE_ED25519
+    public_key_type = Ed25519PublicKey
+
+    def to_bytes(self) -> bytes:
+        return self.ecc_key.seed
+
+    @classmethod
+    def import_key(cls, data: bytes) -> any:
+        return ECC.construct(curve="Ed25519", seed=data)
+
+    def get_sign(self, data: Union[str, bytes]) -> Signature:
+        if isinstance(data, str):
+            data = data.encode()
+
+        return Signature(eddsa.new(self.ecc_key, "rfc8032").sign(data))
+
+class P256PrivateKey(ECCPrivateKey):
+    key_type = KEY_TYPE_P256
+    public_key_type = P256PublicKey
+
+    def to_bytes(self) -> bytes:
+        return int(self.ecc_key.d).to_bytes(32, byteorder='big')
+
+    @classmethod
+    def import_key(cls, data: bytes) -> any:
+        return ECC.construct(curve="P-256", d=int.from_bytes(data, byteorder='big'))
+
+    def get_sign(self, data: Union[str, bytes]) -> Signature:
+        if isinstance(data, str):
+            data = data.encode()
+
+        return Signature(DSS.new(self.ecc_key, "deterministic-rfc6979").sign(SHA256.new(data)))
+
+public_key_types = {
+    KEY_TYPE_ED25519: Ed25519PublicKey,
+    KEY_TYPE_P256: P256PublicKey
+}
+
+private_key_types = {
+    KEY_TYPE_ED25519: Ed25519PrivateKey,
+    KEY_TYPE_P256: P256PrivateKey
+}
+
+SignatureJob = Tuple[PublicKey, bytes, Signature]
+
+class Signable(Serializable, ABC):
+    __signature: Signature = Signature()
+    __signed_data: bytes = None
+    __signer: Signer = None
+
+    @property
+    def signature(self) -> Signature:
+        if self.__signer is not None:
+            signer, self.__signer = self.__signer, None
+            self.sign(signer)
+
+        return self.__signature
+
+    @signature.setter
+    def signature(self, signature: Signature):
+        self.__signer = None
+        self.__signature = signature
+        self._invalidate()
+
+    def defer_sign(self, signer: Signer):
+        self.__signer = signer
+
+    def is_sign_pending(self) -> bool:
+        return self.__signer is not None
+
+    @property
+    def pending_signer(self) -> Signer:
+        return self.__signer
+
+    def signed_children(self) -> Iterator["Signable"]:
+        return iter(())
+
     def validate(self) -> bool:
-        return True
+        return all(key.get_validate(data, signature) for key, data, signature in self.signature_jobs())
+
+    @abstractmethod
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        pass
+
+    def signed_data(self) -> bytes:
+        if self.__signed_data is None:
+            # Bypass fragment() so that computing the data to sign never resolves a deferred signature.
+            raw_data = Serializable.fragment(self)
+            self.__signed_data = compress({k: v for k, v in raw_data.items() if not k == "s"}).encode()
+
+        return self.__signed_data
+
+    def fragment(self) -> any:
+        if self.__signer is not None:
+            self.signature
+
+        return super().fragment()
+
+    def _invalidate(self):
+        self.__signed_data = None
+        super()._invalidate()
 
     def raw_serialize(self) -> dict:
         return {
             **super().raw_serialize(),
-            "s": self.signature.raw_serialize()
+            "s": self.__signature.raw_serialize()
         }
 
     def try_add_sign(self, data: any):
@@ -225,11 +550,11 @@ class Signable(Serializable, ABC):
         return not self.signature == None and not self.signature.raw == None and len(self.signature.raw) > 0
 
     def sign(self, signer: Signer) -> Signature:
-        self.signature = signer.get_sign(self.b64_serialize(with_signature=False))
+        self.signature = signer.get_sign(self.signed_data())
         return self.signature
 
-    def _validate_signature(self, key: Validator) -> bool:
-        return key.get_validate(self.b64_serialize(with_signature=False).encode(), self.signature)
+    def _signature_job(self, key: Key) -> SignatureJob:
+        return key.public_key, self.signed_data(), self.signature
 
     def str_data(self) -> dict:
         return {
@@ -245,10 +570,10 @@ class KeyHolder(Signer, Signable, ABC):
         self.__key = key
 
         if isinstance(key, PrivateKey):
-            self.sign(key)
+            self.defer_sign(key)
 
-    def validate(self) -> bool:
-        return self._validate_signature(self.__key)
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield self._signature_job(self.__key)
 
     def is_private(self) -> bool:
         return isinstance(self.__key, PrivateKey)
@@ -299,3 +624,177 @@ class KeyHolder(Signer, Signable, ABC):
             # "private": self.is_private(),
             **super().str_data()
         }
+
+# Jobs run in-process to measure their cost before deciding whether a worker pool pays off.
+PARALLEL_SAMPLE = 4
+
+# Estimated seconds to start a worker pool and for one round trip through a warm one. The round
+# trip is replaced by a measurement once a pool runs, until then no pool is started just to decide.
+PARALLEL_STARTUP_SECONDS = 0.5
+PARALLEL_ROUND_TRIP_SECONDS = 0.002
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_round_trips: Dict[int, float] = {}
+_pools_lock = Lock()
+
+def _noop(job: any) -> any:
+    return job
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    # Forking a threaded server can copy locks held by other threads, workers start from a clean process instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+
+        return context
+
+    return multiprocessing.get_context("spawn")
+
+def shared_executor(max_workers: int = None) -> ProcessPoolExecutor:
+    workers = max_workers or os.cpu_count() or 1
+
+    with _pools_lock:
+        if not workers in _pools:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            list(pool.map(_noop, range(workers)))
+
+            start = time.perf_counter()
+            list(pool.map(_noop, range(workers)))
+            _round_trips[workers] = time.perf_counter() - start
+            _pools[workers] = pool
+
+    return _pools[workers]
+
+def parallel_threshold(job_seconds: float, max_workers: int = None) -> float:
+    workers = max_workers or os.cpu_count() or 1
+    parallelism = min(workers, os.cpu_count() or 1)
+    if parallelism < 2 or job_seconds <= 0:
+        return math.inf
+
+    overhead = _round_trips.get(workers, PARALLEL_ROUND_TRIP_SECONDS)
+    if not workers in _pools:
+        overhead += PARALLEL_STARTUP_SECONDS
+
+    # Smallest batch whose saved time across the workers exceeds the pool's overhead.
+    return overhead / (job_seconds * (1 - 1 / parallelism))
+
+def _run_jobs(count: int, local: Callable[[int], any], payload: Callable[[int], any], remote: Callable, executor: Executor = None, max_workers: int = None) -> list:
+    results = []
+
+    start = time.perf_counter()
+    while len(results) < min(count, PARALLEL_SAMPLE):
+        results.append(local(len(results)))
+    job_seconds = (time.perf_counter() - start) / max(1, len(results))
+
+    remaining = count - len(results)
+    if remaining == 0:
+        return results
+
+    if executor is None:
+        if remaining < parallel_threshold(job_seconds, max_workers):
+            return results + [local(i) for i in range(len(results), count)]
+
+        executor = shared_executor(max_workers)
+
+    payloads = [payload(i) for i in range(len(results), count)]
+
+    return results + list(executor.map(remote, payloads, chunksize=max(1, len(payloads) // 64)))
+
+def _verify_job(job: Tuple[str, bytes, bytes]) -> bool:
+    key, data, signature = job
+
+    return PublicKey.raw_deserialize(key)._verify(data, Signature(signature))
+
+def verify_many(signables: Iterable[Signable], executor: Executor = None, max_workers: int = None) -> List[bool]:
+    jobs = {}
+    object_jobs = []
+
+    for signable in signables:
+        cache_keys = []
+
+        for key, data, signature in signable.signature_jobs():
+            if data == None or signature == None or signature.raw == None:
+                cache_keys.append(None)
+                continue
+
+            cache_key = (key.fingerprint, hashlib.sha256(data).digest(), signature.raw)
+            cache_keys.append(cache_key)
+
+            if not cache_key in jobs:
+                jobs[cache_key] = (key, data, signature)
+
+        object_jobs.append(cache_keys)
+
+    results = {}
+    pending = []
+    for cache_key, job in jobs.items():
+        if verified_signatures.get(cache_key):
+            results[cache_key] = True
+        else:
+            pending.append(cache_key)
+
+    outcomes = _run_jobs(
+        len(pending),
+        lambda i: jobs[pending[i]][0]._verify(jobs[pending[i]][1], jobs[pending[i]][2]),
+        lambda i: (jobs[pending[i]][0].to_b64(), jobs[pending[i]][1], jobs[pending[i]][2].raw),
+        _verify_job,
+        executor,
+        max_workers
+    )
+    results.update(zip(pending, outcomes))
+
+    for cache_key in pending:
+        if results[cache_key]:
+            verified_signatures.put(cache_key, True)
+
+    return [all(results.get(cache_key, False) for cache_key in cache_keys) for cache_keys in object_jobs]
+
+def _sign_job(job: Tuple[str, bytes]) -> bytes:
+    key, data = job
+
+    return PrivateKey.raw_deserialize(key).get_sign(data).raw
+
+def sign_all(signables: Iterable[Signable], executor: Executor = None, max_workers: int = None):
+    pending = []
+    seen = set()
+    stack = list(signables)
+
+    while stack:
+        signable = stack.pop()
+
+        if id(signable) in seen:
+            continue
+        seen.add(id(signable))
+
+        if signable.is_sign_pending():
+            pending.append(signable)
+        stack.extend(signable.signed_children())
+
+    # Signed data embeds the signatures of children, so sign in waves from the leaves up.
+    while pending:
+        pending_ids = set(id(signable) for signable in pending)
+        wave = [signable for signable in pending if not any(id(child) in pending_ids for child in signable.signed_children())]
+        if len(wave) == 0:
+            raise Exception("Cyclic signature dependencies.")
+
+        wave_ids = set(id(signable) for signable in wave)
+        pending = [signable for signable in pending if not id(signable) in wave_ids]
+
+        jobs = []
+        for signable in wave:
+            signer = signable.pending_signer
+            key = signer.key if isinstance(signer, KeyHolder) else signer
+
+            jobs.append((signable, key, signable.signed_data()))
+
+        signatures = _run_jobs(
+            len(jobs),
+            lambda i: jobs[i][1].get_sign(jobs[i][2]).raw,
+            lambda i: (jobs[i][1].to_b64(), jobs[i][2]),
+            _sign_job,
+            executor,
+            max_workers
+        )
+
+        for (signable, _, _), signature in zip(jobs, signatures):
+            signable.signature = Signature(signature)
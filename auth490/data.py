@@ -1,7 +1,8 @@
-from .crypto import Signable, KeyHolder, PublicKey, Signature, PrivateKey
+from .crypto import Signable, KeyHolder, PublicKey, Signature, PrivateKey, SignatureJob
 from .payload import Request, Payload
+from .serialize import decode, compress
 from enum import Enum, auto
-from typing import List
+from typing import List, Iterator
 
 class DataType(Enum):
     NAME=auto()
@@ -20,7 +21,7 @@ class Data(Signable):
         self.__type = type
 
         if isinstance(provider.key, PrivateKey):
-            self.sign(provider)
+            self.defer_sign(provider)
 
     @property
     def provider(self) -> KeyHolder:
@@ -45,8 +46,8 @@ class Data(Signable):
     def raw_serialize(self) -> dict:
         return {
             **super().raw_serialize(),
-            "p": self.provider.raw_serialize(), 
-            "r": self.recipient.raw_serialize(), 
+            "p": self._embed(self.provider), 
+            "r": self._embed(self.recipient), 
             "v": self.value, 
             "d": self.type.value
         }
@@ -63,8 +64,12 @@ class Data(Signable):
 
         return _data
 
-    def validate(self) -> bool:
-        return self._validate_signature(key=self.provider.key) and super().validate()
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield self._signature_job(self.provider.key)
+
+    def signed_children(self) -> Iterator[Signable]:
+        yield self.provider
+        yield self.recipient
 
     def str_data(self) -> dict:
         return {
@@ -78,6 +83,7 @@ class Data(Signable):
 class DataTransfer(Payload):
     __provider: KeyHolder
     __datas: List[Data]
+    __raw_datas: List[dict] = None
     __challenge: str
 
     def __init__(self, provider: KeyHolder, datas: List[Data], challenge: str = None):
@@ -91,6 +97,10 @@ class DataTransfer(Payload):
 
     @property
     def datas(self) -> List[Data]:
+        if self.__datas is None:
+            self.__datas = [Data.raw_deserialize(d) for d in self.__raw_datas]
+            self.__raw_datas = None
+
         return self.__datas
 
     @property
@@ -104,8 +114,8 @@ class DataTransfer(Payload):
     def raw_serialize(self) -> dict:
         return {
             **super().raw_serialize(),
-            "p": self.provider.raw_serialize(), 
-            "d": [data.raw_serialize() for data in self.datas], 
+            "p": self._embed(self.provider), 
+            "d": [self._embed(data) for data in self.datas], 
             "c": self.challenge
         }
 
@@ -120,8 +130,42 @@ class DataTransfer(Payload):
 
         return data_transfer
 
-    def validate(self) -> bool:
-        return self.provider.validate() and all(data.validate() for data in self.datas) and self._validate_signature(key=self.provider.key)
+    @classmethod
+    def verify_deserialize(cls, data: str, challenge: str) -> "DataTransfer":
+        type_code, raw_data = decode(data)
+
+        if not type_code == cls.get_type():
+            raise Exception("Wrong deserialization type.")
+
+        if not raw_data["c"] == challenge:
+            raise Exception("Challenges do not match.")
+
+        provider = KeyHolder.raw_deserialize(raw_data["p"])
+        signature = Signature.raw_deserialize(raw_data["s"])
+        signed_data = compress({k: v for k, v in raw_data.items() if not k == "s"}).encode()
+
+        if not provider.validate() or not provider.get_validate(signed_data, signature):
+            raise Exception("Invalid transfer.")
+
+        data_transfer = DataTransfer(
+            provider=provider,
+            datas=None,
+            challenge=raw_data["c"]
+        )
+        data_transfer.__raw_datas = raw_data["d"]
+        data_transfer.try_add_sign(raw_data)
+
+        return data_transfer
+
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield from self.provider.signature_jobs()
+        for data in self.datas:
+            yield from data.signature_jobs()
+        yield self._signature_job(self.provider.key)
+
+    def signed_children(self) -> Iterator[Signable]:
+        yield self.provider
+        yield from self.datas
 
     def str_data(self) -> dict:
         return {
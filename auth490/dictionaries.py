@@ -0,0 +1,38 @@
+# Generated by train_dictionary.py, do not edit. Versions are append-only.
+
+DICTIONARIES = {
+    1: (
+        b'"},"c":"246"}","d":[3],"r":{"t":"a","s":"","p":{"#":1},"r":{"#":'
+        b'0},"v":"JOHN DOE","d":2},{"t":"d","s":"","p":{"#":1},"r":{"#":0}'
+        b',"v":"MODERNA","d":2},{"t":"d","s":"","p":{"#":1},"r":{"#":0},"v'
+        b'":"JOHN DOE","d":1},{"t":"d","s":"","p":{"#":1},"r":{"#":0},"v":'
+        b'"PFIZER","d":1},{"t":"d","s":"","d":[1,2],"r":{"t":"a","s":"","p'
+        b'":{"#":1},"r":{"#":0},"v":"ASTRAZENECA","d":2},{"t":"d","s":"","'
+        b'p":{"#":1},"r":{"#":0},"v":"JANE DOE","d":1},{"t":"d","s":"","d"'
+        b':[1],"r":{"t":"a","s":"","d":[2],"r":{"t":"a","s":""},"v":"MODER'
+        b'NA","d":2}","p":{"#":1},"r":{"#":0},"v":"ASTRAZENECA","d":1},{"t'
+        b'":"d","s":"","p":{"#":1},"r":{"#":0},"v":"JANE DOE","d":2},{"t":'
+        b'"d","s":"","d":[2],"r":{"t":"u","s":""},"v":"ASTRAZENECA","d":2}'
+        b'"},"v":"PFIZER","d":1}","n":"Clinic"}},"a":{"t":"a","s":"","p":{'
+        b'"#":1},"r":{"#":0},"v":"PFIZER","d":2},{"t":"d","s":"","n":"Hosp'
+        b'ital"}},"a":{"t":"a","s":"","d":[2,3,1],"r":{"t":"a","s":"","d":'
+        b'[2,1,3],"r":{"t":"a","s":""},"v":"JOHN DOE","d":2}"},"v":"JANE D'
+        b'OE","d":1}"},"v":"JOHN DOE","d":1}","n":"University"}},"a":{"t":'
+        b'"a","s":"","d":[1,2],"r":{"t":"u","s":""},"v":"JANE DOE","d":2}"'
+        b',"d":[1],"r":{"t":"u","s":"","d":[3,1],"r":{"t":"a","s":"","d":['
+        b'2,1],"r":{"t":"u","s":"","n":"Pharmacy"}},"a":{"t":"a","s":""},"'
+        b'v":"PFIZER","d":2}"},{"t":"a","s":"","n":"Government"}},"a":{"t"'
+        b':"a","s":"","n":"Auth490"}]}"},"v":"ASTRAZENECA","d":1}","n":"Cl'
+        b'inic"},"r":{"t":"a","s":"","p":{"t":"u","s":"","n":"Hospital"},"'
+        b'r":{"t":"a","s":"","n":"University"},"r":{"t":"a","s":""},"d":[{'
+        b'"t":"d","s":"","n":"Pharmacy"},"r":{"t":"a","s":"","n":"Governme'
+        b'nt"},"r":{"t":"a","s":"{"t":"dt","s":"{"t":"dr","s":"{"t":"pa","'
+        b's":"{"t":"aa","s":"","p":{"#":0},"d":[{"t":"d","s":"","n":"Hospi'
+        b'tal"},"r":{"t":"u","s":"","n":"Auth490"}},"a":{"t":"a","s":"","n'
+        b'":"Clinic"},"r":{"t":"u","s":"","r":{"t":"pr","s":"","r":{"t":"a'
+        b'r","s":"","n":"Pharmacy"},"r":{"t":"u","s":"","n":"Auth490"}}","'
+        b'n":"University"},"r":{"t":"u","s":"","d":{"#":0},"r":{"#":1}},"a'
+        b'":{"#":1},"h":[{"t":"a","s":"","d":{"t":"a","s":"","n":"Governme'
+        b'nt"},"r":{"t":"u","s":"{"t":"d","s":"","p":{"t":"a","s":"","k":"'
+    ),
+}
@@ -0,0 +1,304 @@
+from .authority import AuthorityApproval
+from .crypto import Key, KeyHolder, PrivateKey, Signable, SignatureJob
+from .payload import Approval
+from .permission import PermissionApproval, PermissionType
+from .serialize import Serializable, cls_deserialize, dumps
+from typing import Iterator, List, Set, Union
+import base64
+import hashlib
+import time
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+def approval_leaf(approval: Approval) -> bytes:
+    # Hash the canonical JSON rather than the zlib output, which may differ between zlib versions.
+    return leaf_hash(dumps(approval.fragment()).encode())
+
+EMPTY_LEAF = leaf_hash(b"")
+EMPTY_ROOT = hashlib.sha256(b"").digest()
+
+class MerkleTree:
+    __levels: List[List[bytes]]
+    __hashed: int
+    __dirty: Set[int]
+
+    def __init__(self):
+        self.__levels = [[]]
+        self.__hashed = 0
+        self.__dirty = set()
+
+    def __len__(self) -> int:
+        return len(self.__levels[0])
+
+    @property
+    def root(self) -> bytes:
+        if len(self) == 0:
+            return EMPTY_ROOT
+
+        self.__rehash()
+
+        return self.__levels[-1][0]
+
+    def append(self, leaf: bytes) -> int:
+        self.__levels[0].append(leaf)
+
+        return len(self) - 1
+
+    def extend(self, leaves: List[bytes]):
+        self.__levels[0].extend(leaves)
+
+    def update(self, index: int, leaf: bytes):
+        self.__levels[0][index] = leaf
+
+        if index < self.__hashed:
+            self.__dirty.add(index)
+
+    def __rehash(self):
+        # Appended and updated leaves are hashed together on the next read, so bulk loads cost O(n) rather than O(n log n).
+        start = self.__hashed
+        dirty = self.__dirty
+        level = 0
+        sha256 = hashlib.sha256
+
+        while len(self.__levels[level]) > 1 and (start < len(self.__levels[level]) or dirty):
+            nodes = self.__levels[level]
+            size = len(nodes)
+
+            if level + 1 == len(self.__levels):
+                self.__levels.append([])
+            upper = self.__levels[level + 1]
+
+            first = start >> 1
+            del upper[first:]
+            upper.extend([sha256(NODE_PREFIX + left + right).digest() for left, right in zip(nodes[first * 2::2], nodes[first * 2 + 1::2])])
+
+            # A node without a right sibling is promoted unchanged.
+            if size % 2 == 1:
+                upper.append(nodes[-1])
+
+            parents = set(index >> 1 for index in dirty if index >> 1 < first)
+            for parent in parents:
+                upper[parent] = node_hash(nodes[parent * 2], nodes[parent * 2 + 1]) if parent * 2 + 1 < size else nodes[parent * 2]
+
+            start = first
+            dirty = parents
+            level += 1
+
+        self.__hashed = len(self)
+        self.__dirty = set()
+
+    def proof(self, index: int) -> List[bytes]:
+        self.__rehash()
+        path = []
+
+        for nodes in self.__levels[:-1]:
+            sibling = index ^ 1
+
+            if sibling < len(nodes):
+                path.append(nodes[sibling])
+
+            index //= 2
+
+        return path
+
+def verify_path(leaf: bytes, index: int, size: int, path: List[bytes], root: bytes) -> bool:
+    if not 0 <= index < size:
+        return False
+
+    value = leaf
+    position = 0
+
+    while size > 1:
+        if index % 2 == 1:
+            if position == len(path):
+                return False
+            value = node_hash(path[position], value)
+            position += 1
+        elif index + 1 < size:
+            if position == len(path):
+                return False
+            value = node_hash(value, path[position])
+            position += 1
+
+        index //= 2
+        size = (size + 1) // 2
+
+    return position == len(path) and value == root
+
+def encode_hash(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).decode()
+
+def decode_hash(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value)
+
+class RegistryCommitment(Signable):
+    __authority: KeyHolder
+    __root: bytes
+    __size: int
+    __revision: int
+    __timestamp: int
+
+    def __init__(self, authority: KeyHolder, root: bytes, size: int, revision: int = 0, timestamp: int = None):
+        self.__authority = authority
+        self.__root = root
+        self.__size = size
+        self.__revision = revision
+        self.__timestamp = timestamp if timestamp is not None else int(time.time())
+
+        if isinstance(authority.key, PrivateKey):
+            self.defer_sign(authority)
+
+    @property
+    def authority(self) -> KeyHolder:
+        return self.__authority
+
+    @property
+    def root(self) -> bytes:
+        return self.__root
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    # Number of revocations the registry had applied, it only grows.
+    @property
+    def revision(self) -> int:
+        return self.__revision
+
+    @property
+    def timestamp(self) -> int:
+        return self.__timestamp
+
+    @classmethod
+    def get_type(cls) -> str:
+        return "rc"
+
+    def raw_serialize(self) -> dict:
+        return {
+            **super().raw_serialize(),
+            "a": self._embed(self.authority),
+            "m": encode_hash(self.root),
+            "n": self.size,
+            "r": self.revision,
+            "e": self.timestamp
+        }
+
+    @classmethod
+    def raw_deserialize(cls, data: dict) -> "RegistryCommitment":
+        commitment = RegistryCommitment(
+            authority=KeyHolder.raw_deserialize(data["a"]),
+            root=decode_hash(data["m"]),
+            size=data["n"],
+            revision=data["r"],
+            timestamp=data["e"]
+        )
+        commitment.try_add_sign(data)
+
+        return commitment
+
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield from self.authority.signature_jobs()
+        yield self._signature_job(self.authority.key)
+
+    def signed_children(self) -> Iterator[Signable]:
+        yield self.authority
+
+    def str_data(self) -> dict:
+        return {
+            "root": self.root.hex(),
+            "size": self.size,
+            "revision": self.revision,
+            "timestamp": self.timestamp,
+            **super().str_data()
+        }
+
+class MembershipProof(Serializable):
+    __commitment: RegistryCommitment
+    __approval: Approval
+    __index: int
+    __path: List[bytes]
+
+    def __init__(self, commitment: RegistryCommitment, approval: Approval, index: int, path: List[bytes]):
+        self.__commitment = commitment
+        self.__approval = approval
+        self.__index = index
+        self.__path = path
+
+    @property
+    def commitment(self) -> RegistryCommitment:
+        return self.__commitment
+
+    @property
+    def approval(self) -> Approval:
+        return self.__approval
+
+    @property
+    def index(self) -> int:
+        return self.__index
+
+    @property
+    def path(self) -> List[bytes]:
+        return self.__path
+
+    @classmethod
+    def get_type(cls) -> str:
+        return "mp"
+
+    def raw_serialize(self) -> dict:
+        return {
+            **super().raw_serialize(),
+            "c": self._embed(self.commitment),
+            "d": self._embed(self.approval),
+            "i": self.index,
+            "p": [encode_hash(value) for value in self.path]
+        }
+
+    @classmethod
+    def raw_deserialize(cls, data: dict) -> "MembershipProof":
+        return MembershipProof(
+            commitment=RegistryCommitment.raw_deserialize(data["c"]),
+            approval=cls_deserialize(Approval, data["d"]),
+            index=data["i"],
+            path=[decode_hash(value) for value in data["p"]]
+        )
+
+    def verify(self, main_authority: Union[Key, KeyHolder], min_revision: int = None, max_age: float = None) -> bool:
+        if not self.commitment.authority.key.fingerprint == main_authority.public_key.fingerprint:
+            return False
+
+        # A commitment from before a revocation still proves the revoked approval, so verifiers bound how stale it may be.
+        if min_revision is not None and self.commitment.revision < min_revision:
+            return False
+
+        if max_age is not None and time.time() - self.commitment.timestamp > max_age:
+            return False
+
+        if not verify_path(approval_leaf(self.approval), self.index, self.commitment.size, self.path, self.commitment.root):
+            return False
+
+        return self.commitment.validate()
+
+    def grants(self, holder: Union[Key, KeyHolder], permission: PermissionType) -> bool:
+        approval = self.approval
+
+        return isinstance(approval, PermissionApproval) and permission in approval.permissions and approval.get_request().requester.key.fingerprint == holder.public_key.fingerprint
+
+    def proves_authority(self, holder: Union[Key, KeyHolder]) -> bool:
+        approval = self.approval
+
+        return isinstance(approval, AuthorityApproval) and approval.get_request().authority.key.fingerprint == holder.public_key.fingerprint
+
+    def str_data(self) -> dict:
+        return {
+            "commitment": self.commitment,
+            "approval": self.approval,
+            "index": self.index,
+            **super().str_data()
+        }
@@ -0,0 +1,189 @@
+from . import crypto, registry, serialize
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, List, Tuple, Union
+import functools
+import sys
+import time
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+SIZE_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 65536)
+
+class Histogram:
+    __buckets: Tuple[float, ...]
+    __counts: List[int]
+    __sum: float
+    __lock: Lock
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.__buckets = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__sum = 0
+        self.__lock = Lock()
+
+    def observe(self, value: float):
+        with self.__lock:
+            self.__counts[bisect_left(self.__buckets, value)] += 1
+            self.__sum += value
+
+    def snapshot(self) -> Tuple[List[Tuple[str, int]], float, int]:
+        with self.__lock:
+            counts, total = list(self.__counts), self.__sum
+
+        cumulative = []
+        running = 0
+        for bound, count in zip([*map(str, self.__buckets), "+Inf"], counts):
+            running += count
+            cumulative.append((bound, running))
+
+        return cumulative, total, running
+
+class Collector:
+    __latencies: Dict[str, Histogram]
+    __sizes: Dict[str, Histogram]
+    __gauges: Dict[str, Callable[[], Union[float, dict]]]
+    __lock: Lock
+
+    def __init__(self):
+        self.__latencies = {}
+        self.__sizes = {}
+        self.__gauges = {}
+        self.__lock = Lock()
+
+    def __histogram(self, histograms: Dict[str, Histogram], name: str, buckets: Tuple[float, ...]) -> Histogram:
+        histogram = histograms.get(name)
+
+        if histogram is None:
+            with self.__lock:
+                histogram = histograms.setdefault(name, Histogram(buckets))
+
+        return histogram
+
+    def observe_latency(self, name: str, seconds: float):
+        self.__histogram(self.__latencies, name, LATENCY_BUCKETS).observe(seconds)
+
+    def observe_size(self, name: str, size: int):
+        self.__histogram(self.__sizes, name, SIZE_BUCKETS).observe(size)
+
+    def gauge(self, name: str, function: Callable[[], Union[float, dict]]):
+        self.__gauges[name] = function
+
+    def clear(self):
+        with self.__lock:
+            self.__latencies = {}
+            self.__sizes = {}
+
+    def render(self) -> str:
+        lines = []
+
+        for metric, histograms, help in [
+            ("auth490_call_seconds", self.__latencies, "Latency of instrumented calls."),
+            ("auth490_payload_bytes", self.__sizes, "Size of serialized payloads.")
+        ]:
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} histogram")
+
+            for name, histogram in sorted(histograms.items()):
+                buckets, total, count = histogram.snapshot()
+
+                for bound, cumulative in buckets:
+                    lines.append(f'{metric}_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{operation="{name}"}} {total}')
+                lines.append(f'{metric}_count{{operation="{name}"}} {count}')
+
+        for name, function in sorted(self.__gauges.items()):
+            value = function()
+            values = value.items() if isinstance(value, dict) else [(None, value)]
+
+            for key, number in values:
+                if isinstance(number, bool) or not isinstance(number, (int, float)):
+                    continue
+
+                metric = f"auth490_{name}" if key is None else f"auth490_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {number}")
+
+        return "\n".join(lines) + "\n"
+
+collector = Collector()
+
+def timed(name: str, function: Callable, size: Callable = None) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            collector.observe_latency(name, time.perf_counter() - start)
+
+        if size is not None:
+            collector.observe_size(name, size(args, result))
+
+        return result
+
+    return wrapper
+
+def argument_size(args: tuple, result: any) -> int:
+    return len(args[0])
+
+def result_size(args: tuple, result: any) -> int:
+    return len(result)
+
+# (metric name, owner, attribute, payload size)
+TARGETS = [
+    ("rsa_sign", crypto.RSAPrivateKey, "get_sign", None),
+    ("ed25519_sign", crypto.Ed25519PrivateKey, "get_sign", None),
+    ("p256_sign", crypto.P256PrivateKey, "get_sign", None),
+    ("rsa_verify", crypto.RSAPublicKey, "_verify", None),
+    ("ed25519_verify", crypto.Ed25519PublicKey, "_verify", None),
+    ("p256_verify", crypto.P256PublicKey, "_verify", None),
+    ("rsa_construct", crypto.RSA, "construct", None),
+    ("verify_many", crypto, "verify_many", None),
+    ("sign_all", crypto, "sign_all", None),
+    ("compress", serialize, "compress", result_size),
+    ("decompress", serialize, "decompress", argument_size),
+    ("serialize", serialize.Serializable, "serialize", result_size),
+    ("deserialize", serialize, "deserialize", argument_size),
+    ("qr_code_render", serialize, "build_qr_code", argument_size),
+    ("qr_code_uri", serialize.Serializable, "qr_code_uri", None),
+    ("qr_code_svg_uri", serialize.Serializable, "qr_code_svg_uri", None),
+    ("registry_insert", registry.Registry, "insert", None),
+    ("registry_insert_many", registry.Registry, "insert_many", None),
+    ("registry_get_permissions", registry.Registry, "get_permissions", None),
+    ("registry_has_permissions", registry.Registry, "has_permissions", None),
+    ("registry_is_authority", registry.Registry, "is_authority", None)
+]
+
+_patched: List[Tuple[any, str, any]] = []
+
+def is_enabled() -> bool:
+    return len(_patched) > 0
+
+def _patch(owner: any, attribute: str, replacement: any):
+    _patched.append((owner, attribute, owner.__dict__[attribute]))
+    setattr(owner, attribute, replacement)
+
+def instrument():
+    if is_enabled():
+        return
+
+    for name, owner, attribute, size in TARGETS:
+        original = owner.__dict__[attribute]
+
+        if isinstance(original, classmethod):
+            _patch(owner, attribute, classmethod(timed(name, original.__func__, size)))
+        elif isinstance(owner, type):
+            _patch(owner, attribute, timed(name, original, size))
+        else:
+            # Module functions are also imported by name into other modules.
+            replacement = timed(name, original, size)
+
+            for module in list(sys.modules.values()):
+                if getattr(module, "__dict__", {}).get(attribute) is original:
+                    _patch(module, attribute, replacement)
+
+def uninstrument():
+    while _patched:
+        owner, attribute, original = _patched.pop()
+        setattr(owner, attribute, original)
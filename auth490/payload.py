@@ -1,6 +1,7 @@
-from .crypto import KeyHolder, Signable, PrivateKey
+from .crypto import KeyHolder, Signable, PrivateKey, SignatureJob
 from .serialize import Serializable
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class Payload(Signable, ABC):
     pass
@@ -12,7 +13,7 @@ class Request(Payload, ABC):
         self._requester = requester
 
         if isinstance(requester.key, PrivateKey):
-            self.sign(requester)
+            self.defer_sign(requester)
 
     @property
     def requester(self) -> KeyHolder:
@@ -22,20 +23,29 @@ class Request(Payload, ABC):
     def get_value(self) -> Serializable:
         pass
 
-    def validate(self) -> bool:
-        return self.requester.validate() and self._validate_signature(self.requester)
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield from self.requester.signature_jobs()
+        yield self._signature_job(self.requester)
+
+    def signed_children(self) -> Iterator[Signable]:
+        value = self.get_value()
+
+        if isinstance(value, Signable):
+            yield value
+
+        yield self.requester
 
     def raw_serialize(self) -> dict:
         value = self.get_value()
         if isinstance(value, list):
-            value = [v.raw_serialize() if isinstance(v, Serializable) else v for v in value]
+            value = [self._embed(v) if isinstance(v, Serializable) else v for v in value]
         elif isinstance(value, Serializable):
-            value = value.raw_serialize()
+            value = self._embed(value)
 
         return {
             **super().raw_serialize(),
             "d": value,
-            "r": self.requester.raw_serialize()
+            "r": self._embed(self.requester)
         }
 
     def str_data(self) -> dict:
@@ -52,7 +62,7 @@ class Approval(Payload, ABC):
         self._approver = approver
 
         if isinstance(approver.key, PrivateKey):
-            self.sign(approver)
+            self.defer_sign(approver)
 
     @property
     def approver(self) -> KeyHolder:
@@ -62,14 +72,19 @@ class Approval(Payload, ABC):
     def get_request() -> Request:
         pass
 
-    def validate(self) -> bool:
-        return self.approver.validate() and self._validate_signature(self.approver)
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        yield from self.approver.signature_jobs()
+        yield self._signature_job(self.approver)
+
+    def signed_children(self) -> Iterator[Signable]:
+        yield self.get_request()
+        yield self.approver
 
     def raw_serialize(self) -> dict:
         return {
             **super().raw_serialize(),
-            "r": self.get_request().raw_serialize(),
-            "a": self.approver.raw_serialize()
+            "r": self._embed(self.get_request()),
+            "a": self._embed(self.approver)
         }
 
     def str_data(self) -> dict:
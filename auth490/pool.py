@@ -0,0 +1,84 @@
+from collections import deque
+from threading import Event, Lock, Thread
+from typing import Callable
+
+class KeyPool:
+    __factory: Callable[[], any]
+    __keys: deque
+    __lock: Lock
+    __refill: Event
+    __thread: Thread
+
+    def __init__(self, factory: Callable[[], any], target: int = 16, threshold: int = 4):
+        if threshold >= target:
+            raise Exception("Key pool threshold must be below its target.")
+
+        self.__factory = factory
+        self.__keys = deque()
+        self.__lock = Lock()
+        self.__refill = Event()
+        self.__thread = None
+        self.__running = False
+        self.target = target
+        self.threshold = threshold
+        self.served = 0
+        self.misses = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.__keys)
+
+    def start(self):
+        with self.__lock:
+            if self.__running:
+                return
+
+            self.__running = True
+            self.__refill.set()
+            self.__thread = Thread(target=self.__fill, name="auth490-key-pool", daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        with self.__lock:
+            self.__running = False
+            self.__refill.set()
+
+    def take(self) -> any:
+        with self.__lock:
+            if self.__keys:
+                key = self.__keys.popleft()
+                self.served += 1
+            else:
+                key = None
+                self.misses += 1
+
+            if len(self.__keys) <= self.threshold:
+                self.__refill.set()
+
+        return key
+
+    def __fill(self):
+        while True:
+            self.__refill.wait()
+
+            if not self.__running:
+                return
+
+            while self.__running and len(self.__keys) < self.target:
+                key = self.__factory()
+
+                with self.__lock:
+                    self.__keys.append(key)
+
+            with self.__lock:
+                if len(self.__keys) >= self.target:
+                    self.__refill.clear()
+
+    def info(self) -> dict:
+        return {
+            "depth": self.depth,
+            "target": self.target,
+            "threshold": self.threshold,
+            "served": self.served,
+            "misses": self.misses
+        }
@@ -1,81 +1,386 @@
 from .authority import Authority, AuthorityRequest, AuthorityApproval
 from .permission import PermissionType, PermissionRequest, PermissionApproval
-from .crypto import KeyHolder, PrivateKey
+from .cache import LRUCache
+from .crypto import KeyHolder, PrivateKey, PublicKey, Key, Signable, verify_many
+from .data import Data
+from .individual import Individual
+from .merkle import MerkleTree, MembershipProof, RegistryCommitment, approval_leaf, EMPTY_LEAF
+from .payload import Payload, Request
+from .revocation import Revocation, RevocationList, revocation_id
+from .serialize import deserialize
+from .store import RegistryRow, RegistryStore
+
+from concurrent.futures import Executor
+from typing import Callable, FrozenSet, Iterable, List, Dict, Set, Union, Optional
+import gc
+import time
+
+AUTHORITY_REQUEST = AuthorityRequest.get_type()
+AUTHORITY_APPROVAL = AuthorityApproval.get_type()
+PERMISSION_REQUEST = PermissionRequest.get_type()
+PERMISSION_APPROVAL = PermissionApproval.get_type()
+REVOCATION = Revocation.get_type()
+
+# Commitments are re-signed at least this often, so verifiers can use a max_age of a few times this.
+COMMITMENT_LIFETIME = 60
+
+PERMISSION_MASKS = {mask: frozenset(permission for permission in PermissionType if mask & (1 << permission.value)) for mask in range(1 << (len(PermissionType) + 1))}
+
+def permission_mask(permissions: Iterable[PermissionType]) -> int:
+    mask = 0
+
+    for permission in permissions:
+        mask |= 1 << permission.value
+
+    return mask
+
+class RegistryEntry:
+    __value: Optional[Payload]
+    __store: Optional[RegistryStore]
+    seq: Optional[int]
+    type: str
+    id: bytes
+    subject: Optional[str]
+    permissions: FrozenSet[PermissionType]
+    leaf: Optional[bytes]
+    target: Optional[bytes]
+    target_type: Optional[str]
+
+    def __init__(self, type: str, id: bytes, subject: str = None, permissions: FrozenSet[PermissionType] = PERMISSION_MASKS[0], leaf: bytes = None, target: bytes = None, target_type: str = None, value: Payload = None, seq: int = None, store: RegistryStore = None):
+        self.type = type
+        self.id = id
+        self.subject = subject
+        self.permissions = permissions
+        self.leaf = leaf
+        self.target = target
+        self.target_type = target_type
+        self.seq = seq
+        self.__value = value
+        self.__store = store
+
+    @classmethod
+    def of(cls, data: Payload) -> "RegistryEntry":
+        if isinstance(data, AuthorityApproval):
+            request = data.get_request()
+
+            return RegistryEntry(data.get_type(), revocation_id(data), subject=request.authority.key.fingerprint, leaf=approval_leaf(data), target=revocation_id(request), value=data)
+        elif isinstance(data, PermissionApproval):
+            request = data.get_request()
+            permissions = PERMISSION_MASKS[permission_mask(data.permissions)]
+
+            return RegistryEntry(data.get_type(), revocation_id(data), subject=request.requester.key.fingerprint, permissions=permissions, leaf=approval_leaf(data), target=revocation_id(request), value=data)
+        elif isinstance(data, Revocation):
+            target = data.target
+
+            if isinstance(target, AuthorityApproval):
+                subject = target.get_request().authority.key.fingerprint
+            elif isinstance(target, PermissionApproval):
+                subject = target.get_request().requester.key.fingerprint
+            else:
+                subject = None
+
+            return RegistryEntry(data.get_type(), revocation_id(data), subject=subject, target=data.target_id, target_type=target.get_type(), value=data)
+
+        return RegistryEntry(data.get_type(), revocation_id(data), value=data)
+
+    @classmethod
+    def from_row(cls, row: tuple, store: RegistryStore) -> "RegistryEntry":
+        seq, type, id, subject, permissions, leaf, target, target_type = row
 
-from typing import List
+        return RegistryEntry(type, id, subject=subject, permissions=PERMISSION_MASKS[permissions], leaf=leaf, target=target, target_type=target_type, seq=seq, store=store)
+
+    @property
+    def value(self) -> Payload:
+        if self.__value is None:
+            self.__value = deserialize(self.__store.get(self.seq))
+
+        return self.__value
+
+    def row(self) -> RegistryRow:
+        return (self.type, self.value.serialize(), self.id, self.subject, permission_mask(self.permissions), self.leaf, self.target, self.target_type)
 
 class Registry:
-    __authority_requests: List[AuthorityRequest]
-    __authority_approvals: List[AuthorityApproval]
+    __authority_requests: Dict[bytes, RegistryEntry]
+    __authority_approvals: List[RegistryEntry]
+
+    __permission_requests: Dict[bytes, RegistryEntry]
+    __permission_approvals: List[RegistryEntry]
+
+    __revocations: List[RegistryEntry]
+    __revoked: Set[bytes]
+    __revocation_list: Optional[RevocationList]
 
-    __permission_requests: List[PermissionRequest]
-    __permission_approvals: List[PermissionApproval]
+    __authorities: Dict[str, RegistryEntry]
+    __permissions: Dict[str, Set[PermissionType]]
+    __authority_approvals_by_key: Dict[str, List[RegistryEntry]]
+    __permission_approvals_by_key: Dict[str, List[RegistryEntry]]
+    __revision: int
 
-    def __init__(self, main_authority: Authority):
+    __tree: MerkleTree
+    __leaves: Dict[bytes, int]
+    __committed: List[RegistryEntry]
+    __commitment: RegistryCommitment
+
+    def __init__(self, main_authority: Authority, store: RegistryStore = None):
         self.__main_authority = main_authority
+        self.__store = None
+        self.__revision = 0
 
         if not main_authority.validate():
             raise Exception("Invalid main authority.")
 
-        self.__authority_requests = []
-        self.__authority_approvals = []
+        self.__reset()
 
         main_authority_request = AuthorityRequest(main_authority, main_authority)
         main_authority_approval = AuthorityApproval(main_authority, main_authority_request)
 
-        self.__authority_approvals.append(AuthorityApproval.deserialize(main_authority_approval.serialize()))
-
-        self.__permission_requests = []
-        self.__permission_approvals = []
+        self.__add(RegistryEntry.of(AuthorityApproval.deserialize(main_authority_approval.serialize())))
 
         main_authority_permission_request = PermissionRequest(main_authority, list(PermissionType))
         main_authority_permission_approval = PermissionApproval(main_authority, list(PermissionType), main_authority_permission_request)
 
-        self.__permission_approvals.append(PermissionApproval.deserialize(main_authority_permission_approval.serialize()))
+        self.__add(RegistryEntry.of(PermissionApproval.deserialize(main_authority_permission_approval.serialize())))
+
+        if store is not None:
+            # Entries were verified when they were accepted, they are indexed from their stored columns and decoded on first use.
+            # Collections during the load would only rescan the objects being built, so they wait until it is done.
+            collecting = gc.isenabled()
+            gc.disable()
+
+            try:
+                for row in store.load(main_authority.key.fingerprint):
+                    self.__add(RegistryEntry.from_row(row, store))
+            finally:
+                if collecting:
+                    gc.enable()
+
+            self.__store = store
+
+    def __reset(self):
+        self.__authority_requests = {}
+        self.__authority_approvals = []
+        self.__permission_requests = {}
+        self.__permission_approvals = []
+        self.__revocations = []
+        self.__revoked = set()
+        self.__revocation_list = None
+        self.__authorities = {}
+        self.__permissions = {}
+        self.__authority_approvals_by_key = {}
+        self.__permission_approvals_by_key = {}
+        self.__tree = MerkleTree()
+        self.__leaves = {}
+        self.__committed = []
+        self.__commitment = None
+        self.__revision += 1
 
     @property
     def authorities(self):
-        return [approval.get_request().authority for approval in self.__authority_approvals]
+        return [entry.value.get_request().authority for entry in self.__authorities.values()]
+
+    @property
+    def revision(self) -> int:
+        return self.__revision
+
+    @property
+    def state(self) -> List[Payload]:
+        # Approvals are kept in Merkle leaf order, so a restored registry has the same root and proof indexes.
+        entries = self.__committed + list(self.__authority_requests.values()) + list(self.__permission_requests.values()) + self.__revocations
+
+        return [entry.value for entry in entries]
+
+    def restore(self, state: List[Payload]):
+        self.__reset()
+
+        for data in state:
+            if isinstance(data, (AuthorityRequest, AuthorityApproval, PermissionRequest, PermissionApproval, Revocation)):
+                self.__add(RegistryEntry.of(data))
 
     @property
     def authority_requests(self):
-        return self.__authority_requests
+        return [entry.value for entry in self.__authority_requests.values()]
 
     @property
     def authority_approvals(self):
-        return self.__authority_approvals
+        return [entry.value for entry in self.__authority_approvals]
 
     @property
     def permission_requests(self):
-        return self.__permission_requests
+        return [entry.value for entry in self.__permission_requests.values()]
 
     @property
     def permission_approvals(self):
-        return self.__permission_approvals
+        return [entry.value for entry in self.__permission_approvals]
+
+    @property
+    def revocations(self):
+        return [entry.value for entry in self.__revocations]
+
+    def is_revoked(self, target: Signable) -> bool:
+        return revocation_id(target) in self.__revoked
+
+    def revocation_list(self) -> RevocationList:
+        # Rebuilding is O(n log n) over every revoked id, so the list is kept until the next revocation.
+        if self.__revocation_list is None:
+            self.__revocation_list = RevocationList.build(self.__revoked)
+
+        return self.__revocation_list
+
+    def commitment(self) -> RegistryCommitment:
+        size, root, revision = len(self.__tree), self.__tree.root, len(self.__revocations)
+        commitment = self.__commitment
+
+        if commitment is None or not commitment.size == size or not commitment.root == root or not commitment.revision == revision or time.time() - commitment.timestamp > COMMITMENT_LIFETIME:
+            if not isinstance(self.__main_authority.key, PrivateKey):
+                raise Exception("Cannot commit without the main authority private key.")
+
+            self.__commitment = RegistryCommitment(self.__main_authority, root, size, revision)
+
+        return self.__commitment
+
+    def prove(self, approval: Union[AuthorityApproval, PermissionApproval]) -> MembershipProof:
+        id = revocation_id(approval)
+
+        if not id in self.__leaves or id in self.__revoked:
+            raise Exception("Approval is not in the registry.")
+
+        index = self.__leaves[id]
+
+        return MembershipProof(self.commitment(), approval, index, self.__tree.proof(index))
+
+    def prove_authority(self, holder: Union[Key, KeyHolder]) -> Optional[MembershipProof]:
+        for entry in self.__authority_approvals_by_key.get(holder.public_key.fingerprint, []):
+            if not entry.id in self.__revoked:
+                return self.prove(entry.value)
+
+        return None
+
+    def prove_permission(self, holder: Union[Key, KeyHolder], permission: PermissionType) -> Optional[MembershipProof]:
+        for entry in self.__permission_approvals_by_key.get(holder.public_key.fingerprint, []):
+            if permission in entry.permissions and not entry.id in self.__revoked:
+                return self.prove(entry.value)
+
+        return None
 
     def get_permissions(self, entity: KeyHolder) -> List[PermissionType]:
-        if entity == self.__main_authority:
-            return list(PermissionType)
+        permissions = self.__permissions.get(entity.key.fingerprint, set())
+
+        return [permission for permission in PermissionType if permission in permissions]
 
     def has_permissions(self, entity: KeyHolder, permission_types: List[PermissionType]):
         if not isinstance(permission_types, list):
             permission_types = [permission_types]
 
-        for permission_type in permission_types:
-            for approval in self.__permission_approvals:
-                if not approval.get_request().requester == entity: continue
-                if not permission_type in approval.permissions: continue
+        permissions = self.__permissions.get(entity.key.fingerprint)
+        if permissions is None:
+            return False
+
+        return all(permission_type in permissions for permission_type in permission_types)
 
+    def is_authority(self, holder: KeyHolder):
+        return holder.key.fingerprint in self.__authorities
+
+    def get_authority(self, key: Key) -> Authority:
+        entry = self.__authorities.get(key.fingerprint)
+
+        return entry.value.get_request().authority if entry is not None else None
+
+    def insert(self, data: any):
+        entry = self.__apply(data)
+
+        if entry is not None and self.__store is not None:
+            entry.seq = self.__store.append(entry.row())
+
+    def insert_many(self, datas: List[any], executor: Executor = None, max_workers: int = None) -> List[Optional[str]]:
+        errors: List[Optional[str]] = [None] * len(datas)
+        entries = []
+
+        for i, data in enumerate(datas):
+            if isinstance(data, (AuthorityRequest, AuthorityApproval, PermissionRequest, PermissionApproval, Revocation)):
+                entries.append(i)
+            else:
+                errors[i] = "Unsupported registry entry."
+
+        valid = verify_many([datas[i] for i in entries], executor=executor, max_workers=max_workers)
+
+        requests = []
+        approvals = []
+        revocations = []
+        for i, is_valid in zip(entries, valid):
+            if not is_valid:
+                errors[i] = "Failed " + datas[i].__class__.__name__ + " validation."
+            elif isinstance(datas[i], Request):
+                requests.append(i)
+            elif isinstance(datas[i], Revocation):
+                revocations.append(i)
+            elif revocation_id(datas[i]) in self.__revoked:
+                errors[i] = "Approval was revoked."
+            else:
+                approvals.append(i)
+
+        # Approvals may depend on permissions granted earlier in the batch, apply them until nothing changes.
+        granted: Dict[str, Set[PermissionType]] = {}
+        ordered = []
+
+        def has_permission(holder: KeyHolder, permission: PermissionType) -> bool:
+            fingerprint = holder.key.fingerprint
+
+            return permission in granted.get(fingerprint, ()) or permission in self.__permissions.get(fingerprint, ())
+
+        while approvals:
+            blocked = []
+
+            for i in approvals:
+                approval = datas[i]
+
+                if isinstance(approval, AuthorityApproval):
+                    ready = has_permission(approval.approver, PermissionType.AUTHORITY_APPROVAL)
+                else:
+                    ready = has_permission(approval.approver, PermissionType.PERMISSION_APPROVAL)
+
+                    if ready:
+                        granted.setdefault(approval.get_request().requester.key.fingerprint, set()).update(approval.permissions)
+
+                if ready:
+                    ordered.append(i)
+                else:
+                    blocked.append(i)
+
+            if len(blocked) == len(approvals):
                 break
+            approvals = blocked
+
+        for i in approvals:
+            if isinstance(datas[i], AuthorityApproval):
+                errors[i] = "Entity cannot approve authority."
             else:
-                return False
+                errors[i] = "Entity cannot approve permission."
 
-        return True
+        for i in ordered:
+            approval = datas[i]
 
-    def is_authority(self, holder: KeyHolder):
-        return any(holder.key == authority.key for authority in self.authorities)
+            if isinstance(approval, PermissionApproval) and not all(permission in approval.get_request().permissions for permission in approval.permissions):
+                errors[i] = "Trying to add unrequested permissions."
 
-    def insert(self, data: any):
+        # Revocations are checked against the permissions as they stand after this batch's approvals.
+        for i in revocations:
+            errors[i] = self.__check_revocation(datas[i], has_permission)
+
+        if any(error is not None for error in errors):
+            return errors
+
+        accepted = [RegistryEntry.of(datas[i]) for i in requests + ordered + revocations]
+
+        for entry in accepted:
+            self.__add(entry)
+
+        if self.__store is not None:
+            for entry, seq in zip(accepted, self.__store.append_many([entry.row() for entry in accepted])):
+                entry.seq = seq
+
+        return errors
+
+    def __apply(self, data: any) -> Optional[RegistryEntry]:
         if isinstance(data, AuthorityRequest):
             self.__request_authority(data)
         elif isinstance(data, AuthorityApproval):
@@ -84,13 +389,20 @@ class Registry:
             self.__request_permission(data)
         elif isinstance(data, PermissionApproval):
             self.__approve_permission(data)
+        elif isinstance(data, Revocation):
+            self.__revoke(data)
+        else:
+            return None
+
+        entry = RegistryEntry.of(data)
+        self.__add(entry)
+
+        return entry
 
     def __request_authority(self, request: AuthorityRequest):
         if not request.validate():
             raise Exception("Failed request authority validation.")
 
-        self.__authority_requests.append(request)
-
     def __approve_authority(self, approval: AuthorityApproval):
         if not approval.validate():
             raise Exception("Failed approve authority validation.")
@@ -98,18 +410,13 @@ class Registry:
         if not self.has_permissions(approval.approver, PermissionType.AUTHORITY_APPROVAL):
             raise Exception("Entity cannot approve authority.")
 
-        request = approval.get_request()
-        if request in self.__authority_requests:
-            self.__authority_requests.remove(request)
-
-        self.__authority_approvals.append(approval)
+        if self.is_revoked(approval):
+            raise Exception("Approval was revoked.")
 
     def __request_permission(self, request: PermissionRequest):
         if not request.validate():
             raise Exception("Failed request permission validation.")
 
-        self.__permission_requests.append(request)
-
     def __approve_permission(self, approval: PermissionApproval):
         if not approval.validate():
             raise Exception("Failed approve permission valdation.")
@@ -117,13 +424,136 @@ class Registry:
         if not self.has_permissions(approval.approver, PermissionType.PERMISSION_APPROVAL):
             raise Exception("Entity cannot approve permission.")
 
+        if self.is_revoked(approval):
+            raise Exception("Approval was revoked.")
+
         request = approval.get_request()
         if not all(permission in request.permissions for permission in approval.permissions):
             raise Exception("Trying to add unrequested permissions.")
 
-        if request in self.__permission_requests:
-            self.__permission_requests.remove(request)
-        self.__permission_approvals.append(approval)
+    def __check_revocation(self, revocation: Revocation, has_permission: Callable[[KeyHolder, PermissionType], bool]) -> Optional[str]:
+        target = revocation.target
+        revoker = revocation.revoker.key.fingerprint
+        main_authority = self.__main_authority.key.fingerprint
+
+        if isinstance(target, AuthorityApproval):
+            if target.get_request().authority.key.fingerprint == main_authority:
+                return "Cannot revoke the main authority."
+
+            allowed = target.approver.key.fingerprint == revoker or has_permission(revocation.revoker, PermissionType.AUTHORITY_APPROVAL)
+        elif isinstance(target, PermissionApproval):
+            if target.get_request().requester.key.fingerprint == main_authority:
+                return "Cannot revoke the main authority."
+
+            allowed = target.approver.key.fingerprint == revoker or has_permission(revocation.revoker, PermissionType.PERMISSION_APPROVAL)
+        elif isinstance(target, Data):
+            allowed = target.provider.key.fingerprint == revoker or has_permission(revocation.revoker, PermissionType.AUTHORITY_APPROVAL)
+        else:
+            return "Cannot revoke " + target.__class__.__name__ + "."
+
+        if not allowed:
+            return "Entity cannot revoke " + target.__class__.__name__ + "."
+
+        return None
+
+    def __revoke(self, revocation: Revocation):
+        if not revocation.validate():
+            raise Exception("Failed revocation validation.")
+
+        error = self.__check_revocation(revocation, lambda holder, permission: self.has_permissions(holder, permission))
+        if error is not None:
+            raise Exception(error)
+
+    def __add(self, entry: RegistryEntry):
+        if entry.type == AUTHORITY_REQUEST:
+            self.__authority_requests[entry.id] = entry
+        elif entry.type == PERMISSION_REQUEST:
+            self.__permission_requests[entry.id] = entry
+        elif entry.type == AUTHORITY_APPROVAL:
+            self.__authority_requests.pop(entry.target, None)
+            self.__authority_approvals.append(entry)
+            self.__authority_approvals_by_key.setdefault(entry.subject, []).append(entry)
+            self.__authorities.setdefault(entry.subject, entry)
+            self.__commit(entry)
+            self.__revision += 1
+        elif entry.type == PERMISSION_APPROVAL:
+            self.__permission_requests.pop(entry.target, None)
+            self.__permission_approvals.append(entry)
+            self.__permission_approvals_by_key.setdefault(entry.subject, []).append(entry)
+            self.__permissions.setdefault(entry.subject, set()).update(entry.permissions)
+            self.__commit(entry)
+        elif entry.type == REVOCATION:
+            self.__add_revocation(entry)
+
+    def __commit(self, entry: RegistryEntry):
+        if not entry.id in self.__leaves:
+            self.__leaves[entry.id] = self.__tree.append(entry.leaf)
+            self.__committed.append(entry)
+
+    def __add_revocation(self, entry: RegistryEntry):
+        self.__revocations.append(entry)
+        self.__revoked.add(entry.target)
+        self.__revocation_list = None
+
+        if entry.target in self.__leaves:
+            self.__tree.update(self.__leaves[entry.target], EMPTY_LEAF)
+
+        fingerprint = entry.subject
+
+        if entry.target_type == AUTHORITY_APPROVAL:
+            approvals = [approval for approval in self.__authority_approvals_by_key.get(fingerprint, []) if not approval.id in self.__revoked]
+
+            if len(approvals) > 0:
+                self.__authorities[fingerprint] = approvals[0]
+            else:
+                self.__authorities.pop(fingerprint, None)
+
+            self.__revision += 1
+        elif entry.target_type == PERMISSION_APPROVAL:
+            permissions = set()
+
+            for approval in self.__permission_approvals_by_key.get(fingerprint, []):
+                if not approval.id in self.__revoked:
+                    permissions.update(approval.permissions)
+
+            if len(permissions) > 0:
+                self.__permissions[fingerprint] = permissions
+            else:
+                self.__permissions.pop(fingerprint, None)
 
     def __str__(self) -> str:
-        return f"Registry(authorities={self.__authority_approvals}, permissions={self.__permission_approvals})"
+        return f"Registry(authorities={self.authority_approvals}, permissions={self.permission_approvals})"
+
+class KeyHolderResolver:
+    __registry: Registry
+    __individuals: LRUCache
+    __revision: int
+
+    def __init__(self, registry: Registry, maxsize: int = 1024):
+        self.__registry = registry
+        self.__individuals = LRUCache(maxsize=maxsize)
+        self.__revision = registry.revision
+
+    def resolve(self, key: Union[PrivateKey, PublicKey]) -> KeyHolder:
+        authority = self.__registry.get_authority(key)
+        if authority is not None:
+            return authority
+
+        if not isinstance(key, PrivateKey):
+            raise Exception("Cannot get key holder with this key.")
+
+        if not self.__revision == self.__registry.revision:
+            self.__individuals.clear()
+            self.__revision = self.__registry.revision
+
+        individual = self.__individuals.get(key.fingerprint)
+
+        if individual is None:
+            # Keep only the public key and its self-signature around, so that requests built
+            # from a cached holder are not signed eagerly with the private key.
+            individual = Individual(key.public_key)
+            individual.signature = Individual(key).signature
+
+            self.__individuals.put(key.fingerprint, individual)
+
+        return individual
@@ -0,0 +1,169 @@
+from .crypto import KeyHolder, PrivateKey, Signable, Signature, SignatureJob
+from .payload import Payload
+from .serialize import cls_deserialize
+from typing import Iterable, Iterator, Union
+import hashlib
+import math
+import struct
+
+REVOCATION_ID_SIZE = 16
+
+REVOCATION_LIST_MAGIC = b"RL1"
+REVOCATION_LIST_HEADER = struct.Struct(">IIB")
+
+def revocation_id(target: Union[Signable, Signature, bytes]) -> bytes:
+    if isinstance(target, Signable):
+        target = target.signature
+
+    if isinstance(target, Signature):
+        target = target.raw
+
+    return hashlib.sha256(target or b"").digest()[:REVOCATION_ID_SIZE]
+
+class Revocation(Payload):
+    __revoker: KeyHolder
+    __target: Signable
+
+    def __init__(self, revoker: KeyHolder, target: Signable):
+        self.__revoker = revoker
+        self.__target = target
+
+        if isinstance(revoker.key, PrivateKey):
+            self.defer_sign(revoker)
+
+    @property
+    def revoker(self) -> KeyHolder:
+        return self.__revoker
+
+    @property
+    def target(self) -> Signable:
+        return self.__target
+
+    @property
+    def target_id(self) -> bytes:
+        return revocation_id(self.__target)
+
+    @classmethod
+    def get_type(cls) -> str:
+        return "rv"
+
+    def raw_serialize(self) -> dict:
+        return {
+            **super().raw_serialize(),
+            "r": self._embed(self.revoker),
+            "d": self._embed(self.target)
+        }
+
+    @classmethod
+    def raw_deserialize(cls, data: dict) -> "Revocation":
+        revocation = Revocation(
+            revoker=KeyHolder.raw_deserialize(data["r"]),
+            target=cls_deserialize(Signable, data["d"])
+        )
+        revocation.try_add_sign(data)
+
+        return revocation
+
+    def signature_jobs(self) -> Iterator[SignatureJob]:
+        # The target must be genuine, otherwise a forged copy could revoke someone else's signature.
+        yield from self.target.signature_jobs()
+        yield from self.revoker.signature_jobs()
+        yield self._signature_job(self.revoker)
+
+    def signed_children(self) -> Iterator[Signable]:
+        yield self.target
+        yield self.revoker
+
+    def str_data(self) -> dict:
+        return {
+            "revoker": self.revoker,
+            "target": self.target,
+            **super().str_data()
+        }
+
+class RevocationList:
+    __bloom: bytes
+    __bits: int
+    __hashes: int
+    __ids: bytes
+    __bytes: bytes = None
+
+    def __init__(self, bloom: bytes, bits: int, hashes: int, ids: bytes):
+        self.__bloom = bloom
+        self.__bits = bits
+        self.__hashes = hashes
+        self.__ids = ids
+
+    @classmethod
+    def build(cls, ids: Iterable[bytes], false_positive_rate: float = 0.01) -> "RevocationList":
+        ids = sorted(set(ids))
+        bits = max(8, math.ceil(-len(ids) * math.log(false_positive_rate) / math.log(2) ** 2))
+        bits = (bits + 7) // 8 * 8
+        hashes = max(1, round(bits / max(1, len(ids)) * math.log(2)))
+        bloom = bytearray(bits // 8)
+
+        for id in ids:
+            for position in cls.__positions(id, bits, hashes):
+                bloom[position >> 3] |= 1 << (position & 7)
+
+        return RevocationList(bytes(bloom), bits, hashes, b"".join(ids))
+
+    @staticmethod
+    def __positions(id: bytes, bits: int, hashes: int) -> Iterator[int]:
+        # Ids are already hash prefixes, so two halves give independent hashes.
+        first = int.from_bytes(id[:8], byteorder='big')
+        second = int.from_bytes(id[8:16], byteorder='big') | 1
+
+        for i in range(hashes):
+            yield (first + i * second) % bits
+
+    def might_contain(self, id: bytes) -> bool:
+        bloom = self.__bloom
+
+        return all(bloom[position >> 3] & (1 << (position & 7)) for position in self.__positions(id, self.__bits, self.__hashes))
+
+    def __contains__(self, target: Union[Signable, Signature, bytes]) -> bool:
+        id = target if isinstance(target, bytes) and len(target) == REVOCATION_ID_SIZE else revocation_id(target)
+
+        if not self.might_contain(id):
+            return False
+
+        ids = self.__ids
+        low, high = 0, len(self)
+
+        while low < high:
+            middle = (low + high) // 2
+            candidate = ids[middle * REVOCATION_ID_SIZE:(middle + 1) * REVOCATION_ID_SIZE]
+
+            if candidate < id:
+                low = middle + 1
+            elif candidate > id:
+                high = middle
+            else:
+                return True
+
+        return False
+
+    def __len__(self) -> int:
+        return len(self.__ids) // REVOCATION_ID_SIZE
+
+    def to_bytes(self) -> bytes:
+        if self.__bytes is None:
+            self.__bytes = REVOCATION_LIST_MAGIC + REVOCATION_LIST_HEADER.pack(len(self), self.__bits, self.__hashes) + self.__bloom + self.__ids
+
+        return self.__bytes
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "RevocationList":
+        if not data.startswith(REVOCATION_LIST_MAGIC):
+            raise Exception("Invalid revocation list.")
+
+        count, bits, hashes = REVOCATION_LIST_HEADER.unpack_from(data, len(REVOCATION_LIST_MAGIC))
+        start = len(REVOCATION_LIST_MAGIC) + REVOCATION_LIST_HEADER.size
+        bloom = data[start:start + bits // 8]
+        ids = data[start + bits // 8:]
+
+        if not len(ids) == count * REVOCATION_ID_SIZE:
+            raise Exception("Invalid revocation list length.")
+
+        return RevocationList(bloom, bits, hashes, ids)
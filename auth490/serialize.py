@@ -1,52 +1,192 @@
-from abc import ABC, abstractclassmethod, abstractmethod
+from abc import ABCMeta, abstractclassmethod, abstractmethod
 import json
-import zlib
 import base64
 import qrcode
 import io
-import re
+import weakref
 from PIL import Image
-from typing import Tuple
+from . import binary
+from .cache import LRUCache
+from .dictionaries import DICTIONARIES
+from typing import Tuple, List, Dict
+
+BINARY_ENCODING = "B1"
+DICTIONARY_PREFIX = "Z"
+DICTIONARY_VERSION = max(DICTIONARIES, default=None)
+
+KEY_TABLE = "h"
+KEY_REFERENCE = "#"
+
+QR_CODE_OFFSET = 45
+QR_CODE_TABLE = {c: "%02d" % (c - QR_CODE_OFFSET) for c in range(256)}
+QR_CODE_DIGITS = bytes.maketrans(b"0123456789", bytes(range(10)))
 
 def qr_code_decompress(data: str) -> Tuple[str, str]:
     header, body = data.split(":")
-    body = bytes([int(d) + 45 for d in re.findall(r"\d\d", body)]).decode()
+
+    # Scanners and form posts add line breaks, anything else that is not a digit is corrupt.
+    digits = "".join(body.split()).encode("ascii", errors="replace")
+    if len(digits) > 0 and not digits.isdigit():
+        raise Exception("Invalid QR code digits.")
+
+    size = len(digits) // 2
+
+    # Every pair becomes tens * 10 + ones + offset <= 144, so the byte-wise
+    # sum of these big integers never carries between bytes.
+    tens = int.from_bytes(digits[0:size * 2:2].translate(QR_CODE_DIGITS), byteorder='big')
+    ones = int.from_bytes(digits[1:size * 2:2].translate(QR_CODE_DIGITS), byteorder='big')
+    offset = int.from_bytes(bytes([QR_CODE_OFFSET]) * size, byteorder='big')
+
+    body = (tens * 10 + ones + offset).to_bytes(size, byteorder='big').decode()
 
     return header, body
 
 def qr_code_compress(header: str, body: str) -> str:
-    data = ''.join("%02d" % (ord(c) - 45) for c in body)
+    data = body.translate(QR_CODE_TABLE)
 
     return header + ":" + data
 
-def compress(data: dict) -> str:
-    dumped_data = json.dumps(data, separators=(',', ':'))
-    compressed_data = zlib.compress(dumped_data.encode())
+class Fragment(dict):
+    __json: str = None
+    owner: "Serializable" = None
+
+    @property
+    def json(self) -> str:
+        if self.__json is None:
+            self.__json = dumps(dict(self))
+
+        return self.__json
+
+def dumps(data: any) -> str:
+    if isinstance(data, Fragment):
+        return data.json
+    elif isinstance(data, dict):
+        return "{" + ",".join(json.dumps(k) + ":" + dumps(v) for k, v in data.items()) + "}"
+    elif isinstance(data, list):
+        return "[" + ",".join(dumps(v) for v in data) + "]"
+
+    return json.dumps(data)
+
+def compress(data: dict, dictionary: int = None) -> str:
+    dumped_data = dumps(data)
+    compressed_data = binary.deflate(dumped_data.encode(), dictionary)
     b64_data = base64.urlsafe_b64encode(compressed_data).decode()
 
     return b64_data
 
-def decompress(data: str) -> dict:
+def decompress(data: str, dictionary: int = None) -> dict:
     if isinstance(data, str):
         data = data.encode()
 
     compressed_data = base64.urlsafe_b64decode(data)
-    raw_data = zlib.decompress(compressed_data).decode()
+    raw_data = binary.inflate(compressed_data, dictionary).decode()
     out_data = json.loads(raw_data)
 
     return out_data
 
-class Serializable(ABC):
+qr_code_images = LRUCache(maxsize=512)
+
+def build_qr_code(data: str) -> qrcode.QRCode:
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=1,
+        border=1
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    return qr
+
+def qr_code_svg(qr: qrcode.QRCode) -> str:
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    path = []
+
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+
+            start = x
+            while x < size and row[x]:
+                x += 1
+
+            path.append(f"M{start} {y}h{x - start}v1h-{x - start}z")
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/>'
+        '</svg>'
+    )
+
+serializable_types: Dict[str, type] = {}
+
+class SerializableMeta(ABCMeta):
+    def __new__(mcls, name: str, bases: tuple, namespace: dict, **kwargs) -> type:
+        cls = super().__new__(mcls, name, bases, namespace, **kwargs)
+
+        get_type = namespace.get("get_type")
+        if get_type is not None and not getattr(get_type, "__isabstractmethod__", False):
+            type_code = cls.get_type()
+
+            if type_code in serializable_types:
+                raise Exception("Duplicate serializable type " + type_code)
+
+            serializable_types[type_code] = cls
+
+        return cls
+
+def registered_types() -> Dict[str, type]:
+    return dict(serializable_types)
+
+class Serializable(metaclass=SerializableMeta):
+    __fragment: any = None
+    __dependents: Dict[int, weakref.ref] = None
+
     @abstractclassmethod
     def get_type(cls) -> str:
         pass
 
+    def fragment(self) -> any:
+        if self.__fragment is None:
+            raw_data = self.raw_serialize()
+            self.__fragment = Fragment(raw_data) if isinstance(raw_data, dict) else raw_data
+
+        return self.__fragment
+
+    def _embed(self, child: "Serializable") -> any:
+        dependents = child.__dependents
+        if dependents is None:
+            dependents = child.__dependents = {}
+
+        # Keyed by id, dead dependents remove themselves so long-lived children stay small.
+        key = id(self)
+        ref = dependents.get(key)
+        if ref is None or ref() is not self:
+            dependents[key] = weakref.ref(self, lambda _, key=key: dependents.pop(key, None))
+
+        return child.fragment()
+
+    def _invalidate(self):
+        self.__fragment = None
+
+        if self.__dependents:
+            dependents, self.__dependents = self.__dependents, None
+
+            for ref in list(dependents.values()):
+                dependent = ref()
+                if dependent is not None:
+                    dependent._invalidate()
+
     def b64_serialize(self, with_signature: bool=True) -> str:
-        raw_data = self.raw_serialize()
+        raw_data = self.fragment()
 
         if isinstance(raw_data, dict):
             if not with_signature and 's' in raw_data:
-                del raw_data["s"]
+                raw_data = {k: v for k, v in raw_data.items() if not k == "s"}
 
             b64_data = compress(raw_data)
         else:
@@ -54,8 +194,28 @@ class Serializable(ABC):
 
         return b64_data
 
-    def serialize(self) -> str:
-        return qr_code_compress(self.get_type().upper(), self.b64_serialize())
+    def serialize(self, binary_encoding: bool=False, key_table: bool=False, dictionary: bool=False) -> str:
+        raw_data = self.fragment()
+        header = self.get_type().upper()
+        version = None
+
+        if key_table and isinstance(raw_data, dict):
+            raw_data = pack_key_table(raw_data)
+
+        if binary_encoding:
+            header += "." + BINARY_ENCODING
+
+        if dictionary and DICTIONARY_VERSION is not None and (binary_encoding or isinstance(raw_data, dict)):
+            version = DICTIONARY_VERSION
+            header += "." + DICTIONARY_PREFIX + str(version)
+
+        if binary_encoding:
+            return header + ":" + binary.to_digits(binary.pack(raw_data, version))
+
+        if isinstance(raw_data, dict):
+            return qr_code_compress(header, compress(raw_data, version))
+
+        return qr_code_compress(header, raw_data)
 
     @abstractmethod
     def raw_serialize(self) -> dict:
@@ -74,27 +234,19 @@ class Serializable(ABC):
 
     @classmethod
     def deserialize(cls, data: str) -> "Self":
-        header, body = qr_code_decompress(data)
+        type_code, raw_data = decode(data)
 
-        if not header.lower() == cls.get_type():
+        if not type_code == cls.get_type():
             raise Exception("Wrong deserialization type.")
 
-        return cls.b64_deserialize(body)
+        return cls.raw_deserialize(raw_data)
 
     @abstractclassmethod
     def raw_deserialize(cls, data: dict) -> "Self":
         pass
 
     def qr_code(self) -> qrcode.QRCode:
-        qr = qrcode.QRCode(
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=1,
-            border=1
-        )
-        qr.add_data(self.serialize())
-        qr.make(fit=True)
-
-        return qr
+        return build_qr_code(self.serialize())
 
     def qr_code_image_bytes(self) -> io.BytesIO:
         data = io.BytesIO()
@@ -104,9 +256,34 @@ class Serializable(ABC):
         return data
 
     def qr_code_uri(self) -> str:
-        header = "data:img/png;base64,"
-        b64_img = base64.b64encode(self.qr_code_image_bytes().getvalue()).decode()
-        uri = header + b64_img
+        serialized = self.serialize()
+        uri = qr_code_images.get(("png", serialized))
+
+        if uri is None:
+            data = io.BytesIO()
+            build_qr_code(serialized).make_image().save(data, "PNG")
+
+            header = "data:img/png;base64,"
+            b64_img = base64.b64encode(data.getvalue()).decode()
+            uri = header + b64_img
+
+            qr_code_images.put(("png", serialized), uri)
+
+        return uri
+
+    def qr_code_svg(self) -> str:
+        return qr_code_svg(build_qr_code(self.serialize()))
+
+    def qr_code_svg_uri(self) -> str:
+        serialized = self.serialize()
+        uri = qr_code_images.get(("svg", serialized))
+
+        if uri is None:
+            header = "data:image/svg+xml;base64,"
+            b64_img = base64.b64encode(qr_code_svg(build_qr_code(serialized)).encode()).decode()
+            uri = header + b64_img
+
+            qr_code_images.put(("svg", serialized), uri)
 
         return uri
 
@@ -121,34 +298,126 @@ class Serializable(ABC):
     def __repr__(self) -> str:
         return str(self)
 
-def is_abstract(cls):
-    return bool(getattr(cls, "__abstractmethods__", False))
-
 def cls_deserialize(cls, data: dict) -> Serializable:
-    if is_abstract(cls):
-        for scls in cls.__subclasses__():
-            out = cls_deserialize(scls, data)
-            if out: 
-                return out
+    if isinstance(data, Fragment) and isinstance(data.owner, cls):
+        return data.owner
+
+    scls = serializable_types.get(data["t"])
+
+    if scls is None or not issubclass(scls, cls):
         return None
 
-    if cls.get_type() == data["t"]:
-        return cls.raw_deserialize(data)
+    result = scls.raw_deserialize(data)
 
-    return None
+    if isinstance(data, Fragment):
+        data.owner = result
 
-def deserialize(data: str) -> Serializable:
-    header, body = qr_code_decompress(data)
-
-    if header == "PK":
-        from .crypto import PrivateKey
-        return PrivateKey.raw_deserialize(body)
-    elif header == "K":
-        from .crypto import PublicKey
-        return PublicKey.raw_deserialize(body)
+    return result
+
+def pack_key_table(data: dict) -> dict:
+    from .crypto import KeyHolder
+
+    table = []
+    indexes = {}
+    references = 0
+
+    def pack(value: any, top: bool=False) -> any:
+        nonlocal references
+
+        if isinstance(value, dict):
+            cls = serializable_types.get(value.get("t"))
+
+            if not top and cls is not None and issubclass(cls, KeyHolder):
+                encoded = dumps(value)
+
+                if not encoded in indexes:
+                    indexes[encoded] = len(table)
+                    table.append(value)
+
+                references += 1
+                return {KEY_REFERENCE: indexes[encoded]}
+
+            return {k: pack(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [pack(v) for v in value]
+
+        return value
+
+    packed = pack(data, top=True)
+
+    if references == len(table):
+        return data
+
+    packed[KEY_TABLE] = table
+
+    return packed
+
+def unpack_key_table(data: dict) -> dict:
+    table = [Fragment(entry) for entry in data[KEY_TABLE]]
+
+    def unpack(value: any) -> any:
+        if isinstance(value, dict):
+            if KEY_REFERENCE in value:
+                return table[value[KEY_REFERENCE]]
+
+            return {k: unpack(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [unpack(v) for v in value]
+
+        return value
+
+    unpacked = unpack(data)
+    del unpacked[KEY_TABLE]
+
+    return unpacked
+
+def get_type_code(data: str) -> str:
+    return data.split(":", 1)[0].split(".", 1)[0].lower()
+
+def decode(data: str) -> Tuple[str, any]:
+    header = data.split(":", 1)[0]
+    type_header, *options = header.split(".")
+    binary_encoding = False
+    version = None
+
+    for option in options:
+        if option == BINARY_ENCODING:
+            binary_encoding = True
+        elif option.startswith(DICTIONARY_PREFIX) and option[1:].isdigit() and int(option[1:]) in DICTIONARIES:
+            version = int(option[1:])
+        else:
+            raise Exception("Unknown encoding " + option)
+
+    if binary_encoding:
+        body = "".join(data[len(header) + 1:].split())
+        if not body.isascii() or not body.isdigit():
+            raise Exception("Invalid QR code digits.")
+
+        raw_data = binary.unpack(binary.from_digits(body), version)
     else:
-        result = cls_deserialize(Serializable, decompress(body))
+        _, body = qr_code_decompress(data)
+
+        if type_header == "PK" or type_header == "K":
+            return type_header.lower(), body
+
+        try:
+            raw_data = decompress(body, version)
+        except Exception as err:
+            return type_header.lower(), body
+
+    if isinstance(raw_data, dict) and KEY_TABLE in raw_data:
+        raw_data = unpack_key_table(raw_data)
+
+    return type_header.lower(), raw_data
+
+def deserialize(data: str) -> Serializable:
+    type_code, raw_data = decode(data)
+
+    if isinstance(raw_data, dict):
+        result = cls_deserialize(Serializable, raw_data)
         if result:
             return result
+    elif type_code in serializable_types:
+        return serializable_types[type_code].raw_deserialize(raw_data)
 
     raise Exception("Unimplemented deserialize.")
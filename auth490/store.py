@@ -0,0 +1,152 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# (type, data, id, subject, permissions, leaf, target, target type)
+RegistryRow = Tuple[str, str, bytes, Optional[str], int, Optional[bytes], Optional[bytes], Optional[str]]
+
+class RegistryStore:
+    __connection: sqlite3.Connection
+    __lock: Lock
+
+    def __init__(self, path: str):
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__lock = Lock()
+
+        with self.__lock:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            # Every entry carries the index columns the registry derives from it, payloads live apart so startup only scans the index.
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS entry ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, id BLOB NOT NULL, subject TEXT, "
+                "permissions INTEGER NOT NULL, leaf BLOB, target BLOB, target_type TEXT)"
+            )
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS payload (seq INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+
+    def __get_meta(self, key: str) -> Optional[str]:
+        row = self.__connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+
+        return row[0] if row else None
+
+    def __set_meta(self, key: str, value: str):
+        self.__connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def load(self, main_authority: str) -> List[Tuple]:
+        with self.__lock:
+            owner = self.__get_meta("main_authority")
+
+            if owner is None:
+                self.__set_meta("main_authority", main_authority)
+            elif not owner == main_authority:
+                raise Exception("Registry store belongs to another main authority.")
+
+            return self.__connection.execute("SELECT seq, type, id, subject, permissions, leaf, target, target_type FROM entry ORDER BY seq").fetchall()
+
+    def get(self, seq: int) -> str:
+        with self.__lock:
+            return self.__connection.execute("SELECT data FROM payload WHERE seq = ?", (seq,)).fetchone()[0]
+
+    def append(self, row: RegistryRow) -> int:
+        return self.append_many([row])[0]
+
+    def append_many(self, rows: List[RegistryRow]) -> List[int]:
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                seqs = []
+
+                for type, data, *index in rows:
+                    seq = self.__connection.execute(
+                        "INSERT INTO entry (type, id, subject, permissions, leaf, target, target_type) VALUES (?, ?, ?, ?, ?, ?, ?)", (type, *index)
+                    ).lastrowid
+                    self.__connection.execute("INSERT INTO payload (seq, data) VALUES (?, ?)", (seq, data))
+                    seqs.append(seq)
+
+                self.__connection.execute("COMMIT")
+            except:
+                self.__connection.execute("ROLLBACK")
+                raise
+
+        return seqs
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+class WalletStore(ABC):
+    @abstractmethod
+    def load(self, session: str) -> List[Tuple[int, str]]:
+        pass
+
+    # Ids are allocated by the store, so concurrent saves to one session never reuse an id.
+    @abstractmethod
+    def save(self, session: str, added: List[str], removed: List[int]) -> List[int]:
+        pass
+
+class MemoryWalletStore(WalletStore):
+    __wallets: Dict[str, Dict[int, str]]
+    __next_id: int
+    __lock: Lock
+
+    def __init__(self):
+        self.__wallets = {}
+        self.__next_id = 1
+        self.__lock = Lock()
+
+    def load(self, session: str) -> List[Tuple[int, str]]:
+        with self.__lock:
+            return sorted(self.__wallets.get(session, {}).items())
+
+    def save(self, session: str, added: List[str], removed: List[int]) -> List[int]:
+        with self.__lock:
+            wallet = self.__wallets.setdefault(session, {})
+
+            for id in removed:
+                wallet.pop(id, None)
+
+            ids = list(range(self.__next_id, self.__next_id + len(added)))
+            wallet.update(zip(ids, added))
+            self.__next_id += len(added)
+
+        return ids
+
+class SQLiteWalletStore(WalletStore):
+    __connection: sqlite3.Connection
+    __lock: Lock
+
+    def __init__(self, path: str):
+        self.__connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__lock = Lock()
+
+        with self.__lock:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS wallet_item (id INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT NOT NULL, data TEXT NOT NULL)")
+            self.__connection.execute("CREATE INDEX IF NOT EXISTS wallet_item_session ON wallet_item (session, id)")
+
+    def load(self, session: str) -> List[Tuple[int, str]]:
+        with self.__lock:
+            return [(row[0], row[1]) for row in self.__connection.execute("SELECT id, data FROM wallet_item WHERE session = ? ORDER BY id", (session,))]
+
+    def save(self, session: str, added: List[str], removed: List[int]) -> List[int]:
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                self.__connection.executemany("DELETE FROM wallet_item WHERE session = ? AND id = ?", [(session, id) for id in removed])
+                ids = [self.__connection.execute("INSERT INTO wallet_item (session, data) VALUES (?, ?)", (session, data)).lastrowid for data in added]
+
+                self.__connection.execute("COMMIT")
+            except:
+                self.__connection.execute("ROLLBACK")
+                raise
+
+        return ids
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
@@ -1,18 +1,93 @@
-from .serialize import Serializable, deserialize
-from .crypto import PrivateKey, PublicKey, Signable
-from .data import Data
-from typing import List
+from .serialize import Serializable, deserialize, get_type_code, serializable_types
+from .crypto import Key, KeyHolder, PrivateKey, PublicKey, Signable, SignatureJob
+from .data import Data, DataType
+from .store import WalletStore
+from typing import Dict, List, Iterator, Optional, Set, Tuple, Union
 from flask import Request, Response
 import base64
+import secrets
+
+SESSION_COOKIE = "wallet_session"
+WALLET_COOKIE = "wallet"
+
+def get_fingerprint(key: Union[str, Key, KeyHolder]) -> str:
+    if isinstance(key, str):
+        return key
+
+    return key.public_key.fingerprint
+
+class WalletItem:
+    __serialized: Optional[str]
+    __value: Optional[Serializable]
+
+    def __init__(self, serialized: str = None, value: Serializable = None):
+        self.__serialized = serialized
+        self.__value = value
+
+    @property
+    def type_code(self) -> str:
+        if self.__value is not None:
+            return self.__value.get_type()
+
+        return get_type_code(self.__serialized)
+
+    @property
+    def value(self) -> Serializable:
+        if self.__value is None:
+            self.__value = deserialize(self.__serialized)
+
+        return self.__value
+
+    @property
+    def serialized(self) -> str:
+        if self.__serialized is None:
+            self.__serialized = self.__value.serialize()
+
+        return self.__serialized
 
 class Wallet(Signable):
-    __data: List[Serializable]
+    __items: List[WalletItem]
+    __ids: List[int]
+    __next_id: int
+    __added: Dict[int, WalletItem]
+    __removed: Set[int]
+    __by_id: Dict[int, WalletItem]
+    __types: Dict[str, Set[int]]
+    __data_types: Dict[DataType, Set[int]]
+    __providers: Dict[str, Set[int]]
+    __recipients: Dict[str, Set[int]]
+    __private_keys: Dict[str, Set[int]]
+    __index_entries: Dict[int, List[Tuple[dict, any]]]
+    __value_indexed: Set[str]
+    __expire_cookie: bool
+    session: Optional[str]
 
-    def __init__(self, data: List[Serializable] = None):
-        if data:
-            self.__data = data
+    def __init__(self, data: List[Serializable] = None, items: List[WalletItem] = None, ids: List[int] = None, session: str = None):
+        if items is not None:
+            self.__items = items
+        elif data:
+            self.__items = [WalletItem(value=d) for d in data]
         else:
-            self.__data = []
+            self.__items = []
+
+        self.__ids = ids if ids is not None else list(range(len(self.__items)))
+        self.__next_id = max(self.__ids, default=-1) + 1
+        self.__added = {}
+        self.__removed = set()
+        self.__expire_cookie = False
+        self.session = session
+
+        self.__by_id = {}
+        self.__types = {}
+        self.__data_types = {}
+        self.__providers = {}
+        self.__recipients = {}
+        self.__private_keys = {}
+        self.__index_entries = {}
+        self.__value_indexed = set()
+
+        for id, item in zip(self.__ids, self.__items):
+            self.__index(id, item)
 
     @classmethod
     def get_type(self) -> str:
@@ -21,57 +96,217 @@ class Wallet(Signable):
     def raw_serialize(self) -> dict:
         return {
             **super().raw_serialize(),
-            "d": [d.serialize() for d in self.__data]
+            "d": [item.serialized for item in self.__items]
         }
 
     @classmethod
     def raw_deserialize(self, data: dict) -> "Wallet":
         wallet = Wallet(
-            data=[deserialize(d) for d in data["d"]]
+            items=[WalletItem(serialized=d) for d in data["d"]]
         )
         wallet.try_add_sign(data)
 
         return wallet
 
-    def validate(self) -> bool:
+    def signature_jobs(self) -> Iterator[SignatureJob]:
         # TODO: Sign wallet?
-        return True
+        return iter(())
 
     def insert(self, data: Serializable):
         if not isinstance(data, PrivateKey) and not isinstance(data, PublicKey) and not isinstance(data, Data):
             raise Exception("Cannot store class to wallet.")
 
-        self.__data.append(data)
+        item = WalletItem(value=data)
+
+        self.__items.append(item)
+        self.__ids.append(self.__next_id)
+        self.__added[self.__next_id] = item
+        self.__index(self.__next_id, item)
+        self.__next_id += 1
+        self._invalidate()
 
     def remove(self, index: int):
-        del self.__data[index]
+        id = self.__ids[index]
+
+        if id in self.__added:
+            del self.__added[id]
+        else:
+            self.__removed.add(id)
+
+        self.__unindex(id, self.__items[index])
+        del self.__items[index]
+        del self.__ids[index]
+        self._invalidate()
+
+    def __index(self, id: int, item: WalletItem):
+        self.__by_id[id] = item
+        self.__types.setdefault(item.type_code, set()).add(id)
+
+        if item.type_code in self.__value_indexed:
+            self.__index_value(id, item.value)
+
+    def __index_value(self, id: int, value: Serializable):
+        if isinstance(value, Data):
+            entries = [
+                (self.__data_types, value.type),
+                (self.__providers, get_fingerprint(value.provider)),
+                (self.__recipients, get_fingerprint(value.recipient))
+            ]
+        elif isinstance(value, PrivateKey):
+            entries = [(self.__private_keys, value.public_key.fingerprint)]
+        else:
+            entries = []
+
+        for index, key in entries:
+            index.setdefault(key, set()).add(id)
+
+        self.__index_entries[id] = entries
+
+    def __unindex(self, id: int, item: WalletItem):
+        del self.__by_id[id]
+        self.__types[item.type_code].discard(id)
+
+        for index, key in self.__index_entries.pop(id, []):
+            index[key].discard(id)
+
+    def __renumber(self, old_ids: List[int], new_ids: List[int]):
+        items = [self.__by_id[id] for id in old_ids]
+        positions = {id: i for i, id in enumerate(self.__ids)}
+
+        # Unindex everything first, a new id may equal another item's provisional one.
+        for id, item in zip(old_ids, items):
+            self.__unindex(id, item)
+
+        for old_id, new_id, item in zip(old_ids, new_ids, items):
+            self.__ids[positions[old_id]] = new_id
+            self.__index(new_id, item)
+
+        self.__next_id = max(self.__ids, default=-1) + 1
+
+    def __require_values(self, type_code: str):
+        # DataType and fingerprint indexes need decoded items, so they are built on first query.
+        if type_code in self.__value_indexed:
+            return
+
+        for id in self.__types.get(type_code, ()):
+            self.__index_value(id, self.__by_id[id].value)
+
+        self.__value_indexed.add(type_code)
+
+    def __select(self, ids: Set[int]) -> List[Serializable]:
+        return [self.__by_id[id].value for id in sorted(ids)]
+
+    def find(self, cls: type) -> List[Serializable]:
+        ids = set()
+
+        for type_code, type_ids in self.__types.items():
+            scls = serializable_types.get(type_code)
+
+            if scls is not None and issubclass(scls, cls):
+                ids |= type_ids
+
+        return self.__select(ids)
+
+    def find_data(self, type: DataType = None, provider: Union[str, Key, KeyHolder] = None, recipient: Union[str, Key, KeyHolder] = None) -> List[Data]:
+        self.__require_values(Data.get_type())
+        ids = set(self.__types.get(Data.get_type(), ()))
+
+        if type is not None:
+            ids &= self.__data_types.get(type, set())
+        if provider is not None:
+            ids &= self.__providers.get(get_fingerprint(provider), set())
+        if recipient is not None:
+            ids &= self.__recipients.get(get_fingerprint(recipient), set())
+
+        return self.__select(ids)
+
+    def find_private_key(self, public_key: Union[str, Key, KeyHolder]) -> Optional[PrivateKey]:
+        self.__require_values(PrivateKey.get_type())
+        ids = self.__private_keys.get(get_fingerprint(public_key), set())
+
+        if len(ids) == 0:
+            return None
+
+        return self.__by_id[min(ids)].value
+
+    @property
+    def dirty(self) -> bool:
+        return len(self.__added) > 0 or len(self.__removed) > 0
+
+    def changes(self) -> Tuple[List[Tuple[int, str]], List[int]]:
+        added = [(id, item.serialized) for id, item in self.__added.items()]
+
+        return added, sorted(self.__removed)
+
+    def mark_clean(self):
+        self.__added = {}
+        self.__removed = set()
 
     @property
     def values(self):
-        return self.__data
+        return [item.value for item in self.__items]
 
     @property
-    def data(self):
-        return [data for data in self.__data if isinstance(data, Data)]
+    def data(self) -> List[Data]:
+        return self.find(Data)
 
     @property
-    def private_keys(self):
-        return [data for data in self.__data if isinstance(data, PrivateKey)]
+    def private_keys(self) -> List[PrivateKey]:
+        return self.find(PrivateKey)
 
     @classmethod
-    def load(cls, request: Request) -> "Wallet":
-        if not "wallet" in request.cookies or len(request.cookies["wallet"].strip()) == 0:
+    def load(cls, request: Request, store: WalletStore = None) -> "Wallet":
+        cookie = request.cookies.get(WALLET_COOKIE, "").strip()
+
+        if store is not None:
+            session = request.cookies.get(SESSION_COOKIE)
+            items = store.load(session) if session else []
+
+            wallet = Wallet(
+                items=[WalletItem(serialized=data) for _, data in items],
+                ids=[id for id, _ in items],
+                session=session or None
+            )
+
+            # Wallets from before the server side store still live in the cookie, their items move to the store on the next dump.
+            if len(cookie) > 0:
+                for value in Wallet.deserialize(cookie).values:
+                    wallet.insert(value)
+
+                wallet.__expire_cookie = True
+
+            return wallet
+
+        if len(cookie) == 0:
             return Wallet()
 
-        return Wallet.deserialize(request.cookies["wallet"])
+        return Wallet.deserialize(cookie)
+
+    def dump(self, response: Response, store: WalletStore = None) -> Response:
+        if not self.dirty and not self.__expire_cookie:
+            return response
+
+        if store is not None:
+            if self.session is None:
+                self.session = secrets.token_urlsafe(24)
+                response.set_cookie(SESSION_COOKIE, self.session, httponly=True, samesite="Lax")
+
+            added, removed = self.changes()
+            ids = store.save(self.session, [data for _, data in added], removed)
+            self.__renumber([id for id, _ in added], ids)
+
+            if self.__expire_cookie:
+                response.delete_cookie(WALLET_COOKIE)
+                self.__expire_cookie = False
+        else:
+            response.set_cookie(WALLET_COOKIE, self.serialize())
 
-    def dump(self, response: Response) -> Response:
-        response.set_cookie(f"wallet", self.serialize())
+        self.mark_clean()
 
         return response
 
     def str_data(self) -> dict:
         return {
-            "data": self.__data,
+            "data": self.values,
             **super().str_data()
         }
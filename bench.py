@@ -0,0 +1,269 @@
+from auth490 import *
+from auth490 import crypto
+from auth490.serialize import qr_code_compress, qr_code_decompress, qr_code_images
+from flask import Response
+from typing import Callable, Dict, List
+import argparse
+import json
+import platform
+import re
+import statistics
+import sys
+import timeit
+
+SIZES = {
+    "data": [1, 8, 32],
+    "registry": [10, 100, 1000],
+    "wallet": [10, 100, 500]
+}
+
+QUICK_SIZES = {name: sizes[:2] for name, sizes in SIZES.items()}
+
+
+# Largest numeric payload a version 40 QR code can hold.
+QR_CODE_MAX_DIGITS = 7089
+
+def reference_qr_code_decompress(data: str):
+    header, body = data.split(":")
+    body = bytes([int(d) + 45 for d in re.findall(r"\d\d", body)]).decode()
+
+    return header, body
+
+def reference_qr_code_compress(header: str, body: str) -> str:
+    data = ''.join("%02d" % (ord(c) - 45) for c in body)
+
+    return header + ":" + data
+
+class CookieRequest:
+    def __init__(self, cookies: dict):
+        self.cookies = cookies
+
+class Bench:
+    results: Dict[str, float]
+    noise: Dict[str, float]
+    pattern: re.Pattern
+    repeat: int
+
+    def __init__(self, pattern: str = None, repeat: int = 9):
+        self.results = {}
+        self.noise = {}
+        self.pattern = re.compile(pattern) if pattern else None
+        self.repeat = repeat
+
+    def wants(self, name: str) -> bool:
+        return self.pattern is None or self.pattern.search(name) is not None
+
+    def time(self, name: str, function: Callable, min_time: float = 0.1):
+        if not self.wants(name):
+            return
+
+        timer = timeit.Timer(function)
+        number, elapsed = timer.autorange()
+
+        if elapsed < min_time:
+            number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+        times = [elapsed / number for elapsed in timer.repeat(repeat=self.repeat, number=number)]
+        seconds = statistics.median(times)
+        self.results[name] = seconds
+
+        # The interquartile range relative to the median, microsecond benchmarks jitter far more than the tolerance.
+        if len(times) > 1:
+            lower, _, upper = statistics.quantiles(times, n=4)
+            self.noise[name] = (upper - lower) / seconds
+        else:
+            self.noise[name] = 0
+
+        print(f"  {name:<44} {format_seconds(seconds)}")
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:10.2f}ms"
+
+    return f"{seconds * 1e6:10.1f}us"
+
+def make_transfer(provider: Authority, individual: Individual, size: int) -> DataTransfer:
+    datas = [Data(provider, individual, f"VALUE {i}", DataType.VACCINE) for i in range(size)]
+    transfer = DataTransfer(individual, datas, "BENCH")
+    transfer.sign(individual)
+
+    return transfer
+
+def bench_keys(bench: Bench):
+    print("Keys")
+
+    bench.time("rsa_generate", RSAPrivateKey.generate_now)
+    bench.time("ed25519_generate", Ed25519PrivateKey.generate)
+
+def bench_transfers(bench: Bench, sizes: List[int]):
+    print("DataTransfer")
+
+    government = Authority(name="Government", key=RSAPrivateKey.generate_now())
+    individual = Individual(key=RSAPrivateKey.generate_now())
+
+    for size in sizes:
+        transfer = make_transfer(government, individual, size)
+        serialized = transfer.serialize()
+        header, body = qr_code_decompress(serialized)
+
+        def validate():
+            crypto.verified_signatures.clear()
+            return transfer.validate()
+
+        def serialize():
+            transfer._invalidate()
+            return transfer.serialize()
+
+        def deserialize_cold():
+            crypto.constructed_keys.clear()
+            return DataTransfer.deserialize(serialized)
+
+        def qr_code_uri():
+            qr_code_images.clear()
+            return transfer.qr_code_uri()
+
+        bench.time(f"sign[data={size}]", lambda: transfer.sign(individual))
+        bench.time(f"validate[data={size}]", validate)
+        bench.time(f"validate_cached[data={size}]", transfer.validate)
+        bench.time(f"serialize[data={size}]", serialize)
+        bench.time(f"deserialize[data={size}]", lambda: DataTransfer.deserialize(serialized))
+        bench.time(f"deserialize_cold[data={size}]", deserialize_cold)
+        if len(serialized) <= QR_CODE_MAX_DIGITS:
+            bench.time(f"qr_code_uri[data={size}]", qr_code_uri, min_time=0.5)
+        bench.time(f"qr_code_compress[data={size}]", lambda: qr_code_compress(header, body))
+        bench.time(f"qr_code_compress_reference[data={size}]", lambda: reference_qr_code_compress(header, body))
+        bench.time(f"qr_code_decompress[data={size}]", lambda: qr_code_decompress(serialized))
+        bench.time(f"qr_code_decompress_reference[data={size}]", lambda: reference_qr_code_decompress(serialized))
+
+def bench_registry(bench: Bench, sizes: List[int]):
+    print("Registry")
+
+    main_authority = Authority(name="Auth490", key=RSAPrivateKey.generate_now())
+
+    for size in sizes:
+        registry = Registry(main_authority=main_authority)
+        state = registry.state
+
+        for i in range(size):
+            authority = Authority(name=f"Authority {i}", key=Ed25519PrivateKey.generate())
+            state.append(AuthorityApproval(main_authority, AuthorityRequest(main_authority, authority)))
+
+        registry.restore(state)
+
+        target = registry.authorities[-1]
+        requests = []
+
+        def insert():
+            if len(requests) == 0:
+                requests.extend(PermissionRequest(target, [PermissionType.DATA_CREATION]) for _ in range(64))
+                crypto.sign_all(requests)
+
+            registry.insert(requests.pop())
+
+        bench.time(f"registry_insert[entries={size}]", insert)
+        bench.time(f"registry_has_permissions[entries={size}]", lambda: registry.has_permissions(target, PermissionType.DATA_CREATION))
+        bench.time(f"registry_is_authority[entries={size}]", lambda: registry.is_authority(target))
+
+def bench_wallet(bench: Bench, sizes: List[int]):
+    print("Wallet")
+
+    government = Authority(name="Government", key=RSAPrivateKey.generate_now())
+    individual = Individual(key=RSAPrivateKey.generate_now())
+
+    for size in sizes:
+        wallet = Wallet()
+        wallet.insert(individual.key)
+
+        for i in range(size - 1):
+            wallet.insert(Data(government, individual, f"VALUE {i}", DataType.VACCINE))
+
+        store = MemoryWalletStore()
+        response = Response()
+        wallet.dump(response, store)
+
+        store_request = CookieRequest({"wallet_session": wallet.session})
+        cookie_request = CookieRequest({"wallet": wallet.serialize()})
+        extra = Data(government, individual, "EXTRA", DataType.NAME)
+
+        def dump():
+            loaded = Wallet.load(store_request, store)
+            loaded.insert(extra)
+            loaded.dump(Response(), store)
+            loaded.remove(-1)
+            loaded.dump(Response(), store)
+
+        bench.time(f"wallet_load[items={size}]", lambda: Wallet.load(store_request, store))
+        bench.time(f"wallet_load_values[items={size}]", lambda: Wallet.load(store_request, store).values)
+        bench.time(f"wallet_load_cookie[items={size}]", lambda: Wallet.load(cookie_request))
+        bench.time(f"wallet_insert_dump[items={size}]", dump)
+        bench.time(f"wallet_find_data[items={size}]", lambda: wallet.find_data(DataType.VACCINE, provider=government))
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float, noise: Dict[str, float] = None, baseline_noise: Dict[str, float] = None) -> List[str]:
+    regressions = []
+    noise = noise or {}
+    baseline_noise = baseline_noise or {}
+
+    print("\nComparison (current / baseline)")
+    for name, seconds in results.items():
+        if not name in baseline:
+            print(f"  {name:<44} {'new':>10}")
+            continue
+
+        ratio = seconds / baseline[name]
+        allowed = tolerance + noise.get(name, 0) + baseline_noise.get(name, 0)
+        flag = ""
+
+        if ratio > 1 + allowed:
+            flag = "  REGRESSION"
+            regressions.append(name)
+
+        print(f"  {name:<44} {ratio:9.2f}x  (limit {1 + allowed:.2f}x){flag}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark auth490 hot paths.")
+    parser.add_argument("--quick", action="store_true", help="Only run the two smallest sizes.")
+    parser.add_argument("--filter", help="Only run benchmarks whose name matches this regex.")
+    parser.add_argument("--repeat", type=int, default=9, help="Timing repeats, the median is reported.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline JSON file to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with these results.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a benchmark counts as a regression.")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    bench = Bench(pattern=args.filter, repeat=args.repeat)
+
+    bench_keys(bench)
+    bench_transfers(bench, sizes["data"])
+    bench_registry(bench, sizes["registry"])
+    bench_wallet(bench, sizes["wallet"])
+
+    output = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": bench.results,
+        "noise": bench.noise
+    }
+
+    if args.output:
+        with open(args.output, "w") as h:
+            json.dump(output, h, indent=4, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as h:
+            json.dump(output, h, indent=4, sort_keys=True)
+        return
+
+    try:
+        with open(args.baseline) as h:
+            baseline = json.load(h)
+    except FileNotFoundError:
+        return
+
+    if compare(bench.results, baseline["results"], args.tolerance, bench.noise, baseline.get("noise", {})):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
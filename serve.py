@@ -1,40 +1,17 @@
-from flask import Flask, request, render_template, Response
+from flask import Flask, request, render_template, Response, jsonify, g
 from auth490 import *
+from auth490 import metrics
 import qrcode
 import base64
+import os
 import os.path
 import random
 from typing import Union
 
 app = Flask(__name__)
 
-if os.path.exists(".pk"):
-    with open(".pk") as h:
-        main_authority_key = PrivateKey.deserialize(h.read())
-else:
-    main_authority_key = PrivateKey.generate()
-
-registry = Registry(
-    main_authority=Authority(
-        name="Auth490", 
-        key=main_authority_key
-    )
-)
-
 def get_key_holder(key: Union[PrivateKey, PublicKey]) -> KeyHolder:
-    if isinstance(key, PrivateKey):
-        public_key = key.public_key
-    else:
-        public_key = key
-
-    for authority in registry.authorities:
-        if authority.key == public_key:
-            return authority
-
-    if not isinstance(key, PrivateKey):
-        raise Exception("Cannot get key holder with this key.")
-
-    return Individual(key)
+    return key_holders.resolve(key)
 
 @app.route("/")
 def main_home():
@@ -48,9 +25,17 @@ def client_home():
 def server_home():
     return render_template("server/index.html")
 
+key_types = {
+    "rsa": RSAPrivateKey,
+    "ed25519": Ed25519PrivateKey,
+    "p256": P256PrivateKey
+}
+
 @app.route("/client/key")
 def client_key():
-    return render_template("client/key.html", private_key=RSAPrivateKey.generate())
+    key_type = key_types[request.args.get("type", "rsa")]
+
+    return render_template("client/key.html", private_key=key_type.generate(), key_types=key_types)
 
 @app.route("/client/view", methods=["GET", "POST"])
 def client_view():
@@ -72,17 +57,72 @@ def server_registry_post():
 
     return render_template("server/registry.html", registry=registry)
 
-@app.before_request 
-def before_request_callback(): 
-    request.wallet = Wallet.load(request)
+@app.route("/server/revocations")
+def server_revocations():
+    return Response(registry.revocation_list().to_bytes(), mimetype="application/octet-stream")
+
+@app.route("/server/registry/proof")
+def server_registry_proof():
+    key = deserialize(request.args["key"])
+
+    if "permission" in request.args:
+        proof = registry.prove_permission(key, PermissionType(int(request.args["permission"])))
+    else:
+        proof = registry.prove_authority(key)
+
+    if proof is None:
+        return jsonify({"error": "No matching approval."}), 404
+
+    return jsonify({
+        "proof": proof.serialize(),
+        "root": proof.commitment.root.hex(),
+        "size": proof.commitment.size,
+        "revision": proof.commitment.revision,
+        "timestamp": proof.commitment.timestamp
+    })
+
+@app.route("/server/registry/batch", methods=["POST"])
+def server_registry_batch():
+    lines = [line.strip() for line in request.get_data(as_text=True).splitlines()]
+    lines = [line for line in lines if len(line) > 0]
+    datas = []
+    errors = []
+
+    for line in lines:
+        try:
+            datas.append(deserialize(line))
+            errors.append(None)
+        except Exception as err:
+            datas.append(None)
+            errors.append(str(err))
+
+    if not any(errors):
+        errors = registry.insert_many(datas)
+
+    applied = not any(errors)
+
+    return jsonify({
+        "applied": applied,
+        "count": len(datas),
+        "errors": [{"line": i + 1, "error": error} for i, error in enumerate(errors) if error is not None]
+    }), 200 if applied else 422
+
+def get_wallet() -> Wallet:
+    if not "wallet" in g:
+        g.wallet = Wallet.load(request, wallet_store)
+
+    return g.wallet
 
 @app.after_request
 def after_request_callback(response: Response):
-    return request.wallet.dump(response)
+    if "wallet" in g:
+        g.wallet.dump(response, wallet_store)
+
+    return response
 
 @app.route("/client/registry")
 def client_registry():
-    return render_template("client/registry.html", PermissionType=PermissionType, wallet=request.wallet)
+    return render_template("client/registry.html", PermissionType=PermissionType, wallet=get_wallet())
 
 @app.route("/client/registry/authority", methods=["POST"])
 def client_registry_authority():
@@ -141,27 +181,40 @@ def client_registry_approve():
 
     return render_template("client/qr_response.html", data=approval)
 
+@app.route("/client/registry/revoke", methods=["POST"])
+def client_registry_revoke():
+    revoker_key = deserialize(request.form["revoker"])
+    revoker = get_key_holder(revoker_key)
+
+    revocation = Revocation(
+        revoker,
+        deserialize(request.form["data"])
+    )
+    revocation.sign(revoker_key)
+
+    return render_template("client/qr_response.html", data=revocation)
+
 @app.route("/client/data")
 def client_data():
-    return render_template("client/data.html", DataType=DataType, default_challenge=random.randrange(0, 10000), wallet=request.wallet)
+    return render_template("client/data.html", DataType=DataType, default_challenge=random.randrange(0, 10000), wallet=get_wallet())
 
 @app.route("/client/wallet")
 def client_wallet():
-    return render_template("client/wallet.html", wallet=request.wallet)
+    return render_template("client/wallet.html", wallet=get_wallet())
 
 @app.route("/client/wallet", methods=["POST"])
 def client_wallet_post():
     data = deserialize(request.form["data"])
 
-    request.wallet.insert(data)
+    get_wallet().insert(data)
 
-    return render_template("client/wallet.html", wallet=request.wallet)
+    return render_template("client/wallet.html", wallet=get_wallet())
 
 @app.route("/client/wallet/delete/<index>", methods=["POST"])
 def client_wallet_delete(index):
-    request.wallet.remove(int(index))
+    get_wallet().remove(int(index))
 
-    return render_template("client/wallet.html", wallet=request.wallet)
+    return render_template("client/wallet.html", wallet=get_wallet())
 
 @app.route("/client/data/request", methods=["POST"])
 def client_data_request():
@@ -220,17 +273,15 @@ def client_data_transfer():
 
 @app.route("/client/data/verify", methods=["POST"])
 def client_data_verify():
-    data_transfer = deserialize(request.form["transfer"])
     data_request = deserialize(request.form["request"])
+    data_transfer = DataTransfer.verify_deserialize(request.form["transfer"], data_request.challenge)
     trusted = True
 
-    if not data_transfer.challenge == data_request.challenge:
-        raise Exception("Challenges do not match.")
-
     if not data_transfer.validate():
         raise Exception("Invalid transfer.")
 
     is_create = registry.is_authority(data_transfer.provider)
+    revoked = [registry.is_revoked(data) for data in data_transfer.datas]
 
     for data in data_transfer.datas:
         if not registry.has_permissions(data.provider, PermissionType.DATA_CREATION):
@@ -238,10 +289,56 @@ def client_data_verify():
         if not is_create and not data.recipient == data_transfer.provider:
             raise Exception("Data recipient does not match data provider.")
 
-    return render_template("client/data_response.html", transfer=data_transfer, trusted=trusted)
+    if any(revoked):
+        trusted = False
+
+    return render_template("client/data_response.html", transfer=data_transfer, trusted=trusted, revoked=revoked)
 
 @app.route("/admin")
 def admin():
     return render_template("admin.html", private_key=main_authority_key)
 
-app.run(host="0.0.0.0", port=5000, debug=True)
+@app.route("/admin/key-pool")
+def admin_key_pool():
+    return jsonify(RSAPrivateKey.pool.info())
+
+@app.route("/metrics")
+def admin_metrics():
+    if not metrics.is_enabled():
+        return Response("Metrics are disabled, set AUTH490_METRICS=1 to enable them.\n", status=404, mimetype="text/plain")
+
+    return Response(metrics.collector.render(), mimetype="text/plain; version=0.0.4")
+
+# Worker processes for batch verification re-import this module, they must not start a server.
+if __name__ == "__main__":
+    RSAPrivateKey.pool = KeyPool(RSAPrivateKey.generate_now, target=16, threshold=4)
+    RSAPrivateKey.pool.start()
+
+    if os.environ.get("AUTH490_METRICS"):
+        metrics.instrument()
+        metrics.collector.gauge("key_pool", RSAPrivateKey.pool.info)
+        render_template = metrics.timed("render_template", render_template)
+
+    if os.path.exists(".pk"):
+        with open(".pk") as h:
+            main_authority_key = PrivateKey.deserialize(h.read())
+    else:
+        main_authority_key = RSAPrivateKey.generate()
+
+        # The registry store is bound to the main authority key.
+        with open(".pk", "w") as h:
+            h.write(main_authority_key.serialize())
+
+    registry = Registry(
+        main_authority=Authority(
+            name="Auth490", 
+            key=main_authority_key
+        ),
+        store=RegistryStore(".registry")
+    )
+
+    wallet_store = SQLiteWalletStore(".wallets")
+
+    key_holders = KeyHolderResolver(registry)
+
+    app.run(host="0.0.0.0", port=5000, debug=True)
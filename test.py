@@ -1,4 +1,22 @@
 from auth490 import *
+from auth490 import metrics
+from auth490.merkle import leaf_hash, verify_path
+from auth490.serialize import dumps, pack_key_table, unpack_key_table
+from flask import Request as FlaskRequest, Response as FlaskResponse
+import itertools
+import os
+import random
+import tempfile
+
+def assert_rejected(message: str, function, *args):
+    try:
+        function(*args)
+    except Exception as err:
+        assert str(err) == message, err
+        print("Rejected:", err)
+        return
+
+    raise AssertionError("Not rejected: " + message)
 
 def test():
     print("Registry\n")
@@ -81,7 +99,595 @@ def test():
     transfer.sign(individual)
     print("Transfer:", transfer)
     print("Data Length:", len(transfer.serialize()), "/", "7089")
+    print("Binary Data Length:", len(transfer.serialize(binary_encoding=True)), "/", "7089")
+    print(deserialize(transfer.serialize(binary_encoding=True)))
+
+
+def test_key_holder_resolvers():
+    print("Key Holders\n")
+
+    registry = Registry(
+        main_authority=Authority(
+            name="Auth490",
+            key=RSAPrivateKey.generate()
+        )
+    )
+
+    for key_type in [RSAPrivateKey, Ed25519PrivateKey, P256PrivateKey]:
+        key = key_type.generate()
+
+        first = KeyHolderResolver(registry).resolve(key)
+        second = KeyHolderResolver(registry).resolve(key)
+        print(key_type.__name__, first)
+
+        assert first == second
+        assert first.validate() and second.validate()
+        assert deserialize(first.serialize()) == second
+
+
+def test_registry_restore():
+    print("Registry Restore\n")
+
+    auth490 = Authority(
+        name="Auth490",
+        key=Ed25519PrivateKey.generate()
+    )
+
+    entries = []
+    for i in range(3):
+        authority = Authority(
+            name=f"Authority {i}",
+            key=Ed25519PrivateKey.generate()
+        )
+        authority_request = AuthorityRequest(auth490, authority)
+        permission_request = PermissionRequest(authority, [PermissionType.DATA_CREATION])
+
+        # Interleave authority and permission approvals, restore used to regroup them.
+        entries += [
+            authority_request,
+            AuthorityApproval(auth490, authority_request),
+            permission_request,
+            PermissionApproval(auth490, permission_request.permissions, permission_request)
+        ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "registry")
+        registry = Registry(auth490, store=RegistryStore(path))
+
+        for entry in entries:
+            registry.insert(entry)
+
+        proof = registry.prove_permission(entries[-1].get_request().requester, PermissionType.DATA_CREATION)
+        root = registry.commitment().root
+        print("Root:", root.hex())
+
+        replayed = Registry(auth490)
+        for entry in entries:
+            replayed.insert(entry)
+        assert replayed.commitment().root == root
+
+        reloaded = Registry(auth490, store=RegistryStore(path))
+        assert reloaded.commitment().root == root
+        assert [entry.serialize() for entry in reloaded.state] == [entry.serialize() for entry in registry.state]
+        assert reloaded.prove(proof.approval).index == proof.index
+
+        registry.restore(registry.state)
+        assert registry.commitment().root == root
+        assert registry.prove(proof.approval).index == proof.index
+
+        restored_proof = MembershipProof.deserialize(proof.serialize())
+        assert restored_proof.verify(auth490)
+        assert restored_proof.commitment.root == reloaded.commitment().root
+
+
+def test_revocations():
+    print("Revocations\n")
+
+    auth490 = Authority(
+        name="Auth490",
+        key=Ed25519PrivateKey.generate()
+    )
+    registry = Registry(
+        main_authority=auth490
+    )
+
+    hospital = Authority(
+        name="Hospital",
+        key=Ed25519PrivateKey.generate()
+    )
+    hospital_request = AuthorityRequest(auth490, hospital)
+    hospital_approval = AuthorityApproval(auth490, hospital_request)
+    hospital_permission_request = PermissionRequest(hospital, [PermissionType.DATA_CREATION])
+    hospital_permission_approval = PermissionApproval(auth490, hospital_permission_request.permissions, hospital_permission_request)
+
+    for entry in [hospital_request, hospital_approval, hospital_permission_request, hospital_permission_approval]:
+        registry.insert(entry)
+
+    individual = Individual(
+        key=Ed25519PrivateKey.generate()
+    )
+    vaccine = Data(hospital, individual, "PFIZER", DataType.VACCINE)
+    name = Data(hospital, individual, "JOHN DOE", DataType.NAME)
+
+    # Only the approver or a holder of the matching approval permission may revoke.
+    assert_rejected("Entity cannot revoke PermissionApproval.", registry.insert, Revocation(hospital, hospital_permission_approval))
+    assert_rejected("Entity cannot revoke Data.", registry.insert, Revocation(individual, vaccine))
+    assert_rejected("Cannot revoke the main authority.", registry.insert, Revocation(hospital, registry.authority_approvals[0]))
+
+    assert registry.insert_many([Revocation(individual, vaccine)]) == ["Entity cannot revoke Data."]
+
+    forged = Revocation(hospital, vaccine)
+    forged.signature = Revocation(individual, vaccine).signature
+    assert_rejected("Failed revocation validation.", registry.insert, deserialize(forged.serialize()))
+
+    registry.insert(deserialize(Revocation(hospital, vaccine).serialize()))
+    assert registry.is_revoked(vaccine)
+    assert not registry.is_revoked(name)
+
+    registry.insert(Revocation(auth490, hospital_permission_approval))
+    assert registry.is_revoked(hospital_permission_approval)
+    assert not registry.has_permissions(hospital, PermissionType.DATA_CREATION)
+    assert registry.is_authority(hospital)
+
+    assert_rejected("Approval was revoked.", registry.insert, hospital_permission_approval)
+
+    revocation_list = RevocationList.from_bytes(registry.revocation_list().to_bytes())
+    print("Revocation List:", len(revocation_list), "ids")
+
+    assert len(revocation_list) == 2
+    assert vaccine in revocation_list
+    assert hospital_permission_approval in revocation_list
+    assert not name in revocation_list
+    assert not hospital_approval in revocation_list
+
+    registry.restore(registry.state)
+    assert registry.is_revoked(vaccine)
+    assert not registry.has_permissions(hospital, PermissionType.DATA_CREATION)
+
+
+def test_batch_inserts():
+    print("Batch Inserts\n")
+
+    auth490 = Authority(
+        name="Auth490",
+        key=Ed25519PrivateKey.generate()
+    )
+    registry = Registry(
+        main_authority=auth490
+    )
+
+    delegate = Authority(
+        name="Delegate",
+        key=Ed25519PrivateKey.generate()
+    )
+    deputy = Authority(
+        name="Deputy",
+        key=Ed25519PrivateKey.generate()
+    )
+    lab = Authority(
+        name="Lab",
+        key=Ed25519PrivateKey.generate()
+    )
+
+    delegate_request = PermissionRequest(delegate, [PermissionType.PERMISSION_APPROVAL])
+    deputy_request = PermissionRequest(deputy, [PermissionType.PERMISSION_APPROVAL, PermissionType.AUTHORITY_APPROVAL])
+    lab_request = PermissionRequest(lab, [PermissionType.DATA_CREATION])
+    lab_authority_request = AuthorityRequest(deputy, lab)
+
+    # Each approver is granted its permission by an approval further down the chain.
+    chain = [
+        delegate_request,
+        PermissionApproval(auth490, delegate_request.permissions, delegate_request),
+        deputy_request,
+        PermissionApproval(delegate, deputy_request.permissions, deputy_request),
+        lab_request,
+        PermissionApproval(deputy, lab_request.permissions, lab_request),
+        lab_authority_request,
+        AuthorityApproval(deputy, lab_authority_request)
+    ]
+    shuffled = list(reversed(chain))
+    random.Random(490).shuffle(shuffled)
+
+    # A rejected line rolls back the whole batch.
+    unrequested = PermissionRequest(lab, [PermissionType.DATA_CREATION])
+    state = [entry.serialize() for entry in registry.state]
+    root = registry.commitment().root
+
+    errors = registry.insert_many(shuffled + [unrequested, PermissionApproval(deputy, [PermissionType.AUTHORITY_APPROVAL], unrequested)])
+    assert errors == [None] * (len(shuffled) + 1) + ["Trying to add unrequested permissions."]
+    assert [entry.serialize() for entry in registry.state] == state
+    assert registry.commitment().root == root
+    assert not registry.has_permissions(delegate, PermissionType.PERMISSION_APPROVAL)
+    assert not registry.is_authority(lab)
+
+    assert registry.insert_many(shuffled) == [None] * len(shuffled)
+    assert registry.has_permissions(deputy, [PermissionType.PERMISSION_APPROVAL, PermissionType.AUTHORITY_APPROVAL])
+    assert registry.has_permissions(lab, PermissionType.DATA_CREATION)
+    assert registry.is_authority(lab)
+    assert len(registry.permission_requests) == 0
+    assert len(registry.authority_requests) == 0
+    assert registry.prove_permission(lab, PermissionType.DATA_CREATION).verify(auth490)
+
+    # Errors keep the position of their line, /server/registry/batch reports them one-based.
+    outsider = Authority(
+        name="Outsider",
+        key=Ed25519PrivateKey.generate()
+    )
+    outsider_request = PermissionRequest(outsider, [PermissionType.DATA_CREATION])
+    forged = PermissionApproval(auth490, outsider_request.permissions, outsider_request)
+    forged.signature = PermissionApproval(outsider, outsider_request.permissions, outsider_request).signature
+    individual = Individual(
+        key=Ed25519PrivateKey.generate()
+    )
+
+    batch = [
+        outsider_request,
+        Data(lab, individual, "NEGATIVE", DataType.VACCINE),
+        deserialize(forged.serialize()),
+        PermissionApproval(outsider, outsider_request.permissions, outsider_request),
+        PermissionApproval(lab, outsider_request.permissions, outsider_request),
+        PermissionApproval(deputy, [PermissionType.AUTHORITY_APPROVAL], outsider_request)
+    ]
+    metrics.collector.clear()
+    metrics.instrument()
+
+    try:
+        errors = registry.insert_many(batch)
+        rendered = metrics.collector.render()
+    finally:
+        metrics.uninstrument()
+
+    print("Errors:", errors)
+    assert 'auth490_call_seconds_count{operation="registry_insert_many"} 1' in rendered
+
+    assert [(i + 1, error) for i, error in enumerate(errors) if error is not None] == [
+        (2, "Unsupported registry entry."),
+        (3, "Failed PermissionApproval validation."),
+        (4, "Entity cannot approve permission."),
+        (5, "Entity cannot approve permission."),
+        (6, "Trying to add unrequested permissions.")
+    ]
+    assert not registry.has_permissions(outsider, PermissionType.DATA_CREATION)
+    assert len(registry.permission_requests) == 0
+
+
+def test_membership_proofs():
+    print("Membership Proofs\n")
+
+    for size in range(1, 20):
+        tree = MerkleTree()
+        leaves = [leaf_hash(bytes([i])) for i in range(size)]
+
+        for leaf in leaves:
+            tree.append(leaf)
+
+        for index, leaf in enumerate(leaves):
+            path = tree.proof(index)
+
+            assert verify_path(leaf, index, size, path, tree.root)
+            assert not verify_path(leaf_hash(b"other"), index, size, path, tree.root)
+            assert size == 1 or not verify_path(leaf, (index + 1) % size, size, path, tree.root)
+
+    auth490 = Authority(
+        name="Auth490",
+        key=Ed25519PrivateKey.generate()
+    )
+    registry = Registry(
+        main_authority=auth490
+    )
+
+    clinic = Authority(
+        name="Clinic",
+        key=Ed25519PrivateKey.generate()
+    )
+    clinic_request = AuthorityRequest(auth490, clinic)
+    clinic_permission_request = PermissionRequest(clinic, [PermissionType.DATA_CREATION])
+
+    for entry in [
+        clinic_request,
+        AuthorityApproval(auth490, clinic_request),
+        clinic_permission_request,
+        PermissionApproval(auth490, clinic_permission_request.permissions, clinic_permission_request)
+    ]:
+        registry.insert(entry)
+
+    impostor = Authority(
+        name="Clinic",
+        key=Ed25519PrivateKey.generate()
+    )
+
+    proof = deserialize(registry.prove_permission(clinic, PermissionType.DATA_CREATION).serialize())
+    print("Proof:", proof)
+
+    assert proof.verify(auth490.key.public_key)
+    assert proof.grants(clinic, PermissionType.DATA_CREATION)
+    assert not proof.grants(clinic, PermissionType.AUTHORITY_APPROVAL)
+    assert not proof.grants(impostor, PermissionType.DATA_CREATION)
+    assert not proof.verify(impostor)
+
+    authority_proof = deserialize(registry.prove_authority(clinic).serialize(binary_encoding=True))
+    assert authority_proof.verify(auth490)
+    assert authority_proof.proves_authority(clinic)
+    assert not authority_proof.proves_authority(impostor)
+
+    # Swapping a path hash, the index or the approval breaks the proof.
+    tampered_path = MembershipProof(proof.commitment, proof.approval, proof.index, [bytes(32)] + proof.path[1:])
+    tampered_index = MembershipProof(proof.commitment, proof.approval, proof.index - 1, proof.path)
+    tampered_approval = MembershipProof(proof.commitment, authority_proof.approval, proof.index, proof.path)
+    assert not any(tampered.verify(auth490) for tampered in [tampered_path, tampered_index, tampered_approval])
+
+    impostor_commitment = RegistryCommitment(impostor, proof.commitment.root, proof.commitment.size)
+    assert not MembershipProof(impostor_commitment, proof.approval, proof.index, proof.path).verify(auth490)
+
+    forged_commitment = RegistryCommitment(proof.commitment.authority, proof.commitment.root, proof.commitment.size)
+    forged_commitment.signature = impostor.get_sign(forged_commitment.signed_data())
+    assert not MembershipProof(forged_commitment, proof.approval, proof.index, proof.path).verify(auth490)
+
+    # Stale commitments keep a valid signature, the revision and timestamp let verifiers reject them.
+    stale_commitment = RegistryCommitment(auth490, proof.commitment.root, proof.commitment.size, proof.commitment.revision, proof.commitment.timestamp - 3600)
+    stale = MembershipProof(stale_commitment, proof.approval, proof.index, proof.path)
+    assert stale.verify(auth490)
+    assert not stale.verify(auth490, max_age=60)
+    assert proof.verify(auth490, max_age=60)
+
+    forged_revision = RegistryCommitment(proof.commitment.authority, proof.commitment.root, proof.commitment.size, proof.commitment.revision + 1, proof.commitment.timestamp)
+    forged_revision.signature = proof.commitment.signature
+    assert not MembershipProof(forged_revision, proof.approval, proof.index, proof.path).verify(auth490)
+
+    registry.insert(Revocation(auth490, proof.approval))
+    assert registry.prove_permission(clinic, PermissionType.DATA_CREATION) is None
+    assert not registry.commitment().root == proof.commitment.root
+
+    revision = registry.commitment().revision
+    assert revision == proof.commitment.revision + 1
+    assert proof.verify(auth490)
+    assert not proof.verify(auth490, min_revision=revision)
+    assert not authority_proof.verify(auth490, min_revision=revision)
+    assert registry.prove_authority(clinic).verify(auth490, min_revision=revision)
+
+
+def test_deferred_signing():
+    print("Deferred Signing\n")
+
+    auth490 = Authority(
+        name="Auth490",
+        key=Ed25519PrivateKey.generate()
+    )
+    clinic = Authority(
+        name="Clinic",
+        key=P256PrivateKey.generate()
+    )
+    individual = Individual(
+        key=Ed25519PrivateKey.generate()
+    )
+
+    clinic_request = AuthorityRequest(auth490, clinic)
+    clinic_permission_request = PermissionRequest(clinic, [PermissionType.DATA_CREATION])
+    transfer = DataTransfer(individual, [Data(clinic, individual, value, DataType.VACCINE) for value in ["PFIZER", "MODERNA"]], "CHALLENGE")
+    transfer.defer_sign(individual)
+
+    signables = [
+        AuthorityApproval(auth490, clinic_request),
+        PermissionApproval(auth490, clinic_permission_request.permissions, clinic_permission_request),
+        transfer
+    ]
+
+    def tree(signable):
+        yield signable
+        for child in signable.signed_children():
+            yield from tree(child)
+
+    nodes = [node for signable in signables for node in tree(signable)]
+    assert all(node.is_sign_pending() for node in nodes)
+
+    sign_all(signables)
+
+    assert not any(node.is_sign_pending() for node in nodes)
+    assert all(signable.validate() for signable in signables)
+    assert all(deserialize(signable.serialize()).validate() for signable in signables)
+
+
+def test_transfer_verification():
+    print("Transfer Verification\n")
+
+    clinic = Authority(
+        name="Clinic",
+        key=Ed25519PrivateKey.generate()
+    )
+    individual = Individual(
+        key=P256PrivateKey.generate()
+    )
+    impostor = Individual(
+        key=P256PrivateKey.generate()
+    )
+
+    datas = [Data(clinic, individual, value, DataType.VACCINE) for value in ["PFIZER", "MODERNA"]]
+    transfer = DataTransfer(individual, datas, "CHALLENGE")
+    transfer.sign(individual)
+
+    forged = DataTransfer(individual, datas, "CHALLENGE")
+    forged.signature = impostor.get_sign(forged.signed_data())
+
+    built = []
+    raw_deserialize = Data.__dict__["raw_deserialize"]
+
+    def counting_raw_deserialize(cls, data: dict) -> Data:
+        built.append(data)
+        return raw_deserialize.__func__(cls, data)
+
+    # Rejected transfers must fail before any Data is decoded, and accepted ones decode them on first use.
+    Data.raw_deserialize = classmethod(counting_raw_deserialize)
+    try:
+        assert_rejected("Challenges do not match.", DataTransfer.verify_deserialize, transfer.serialize(), "OTHER")
+        assert_rejected("Invalid transfer.", DataTransfer.verify_deserialize, forged.serialize(), "CHALLENGE")
+        assert_rejected("Wrong deserialization type.", DataTransfer.verify_deserialize, datas[0].serialize(), "CHALLENGE")
+        assert len(built) == 0
+
+        for binary_encoding, key_table in itertools.product([False, True], repeat=2):
+            serialized = transfer.serialize(binary_encoding=binary_encoding, key_table=key_table)
+
+            assert_rejected("Invalid transfer.", DataTransfer.verify_deserialize, forged.serialize(binary_encoding=binary_encoding, key_table=key_table), "CHALLENGE")
+            assert len(built) == 0
+
+            verified = DataTransfer.verify_deserialize(serialized, "CHALLENGE")
+            assert len(built) == 0
+
+            assert [data.value for data in verified.datas] == ["PFIZER", "MODERNA"]
+            assert len(built) == 2
+            assert verified.validate()
+            assert verified.serialize() == transfer.serialize()
+            built.clear()
+    finally:
+        Data.raw_deserialize = raw_deserialize
+
+
+def test_wallet_store():
+    print("Wallet Store\n")
+
+    clinic = Authority(
+        name="Clinic",
+        key=Ed25519PrivateKey.generate()
+    )
+    individual = Individual(
+        key=Ed25519PrivateKey.generate()
+    )
+
+    store = MemoryWalletStore()
+    # Another session takes the first ids, the wallet's provisional ids must be replaced by the store's.
+    store.save("other", [individual.key.public_key.serialize()], [])
+
+    def load(session: str = None) -> Wallet:
+        headers = {"Cookie": f"wallet_session={session}"} if session else {}
+
+        return Wallet.load(FlaskRequest.from_values(headers=headers), store)
+
+    def decoded() -> int:
+        for line in metrics.collector.render().splitlines():
+            if line.startswith('auth490_call_seconds_count{operation="deserialize"}'):
+                return int(line.split()[-1])
+
+        return 0
+
+    wallet = load()
+    for item in [clinic.key, individual.key, Data(clinic, individual, "PFIZER", DataType.VACCINE), Data(clinic, individual, "JOHN DOE", DataType.NAME)]:
+        wallet.insert(item)
+
+    response = wallet.dump(FlaskResponse(), store)
+    session = wallet.session
+    assert any(cookie.startswith(f"wallet_session={session};") for cookie in response.headers.getlist("Set-Cookie"))
+    assert [id for id, _ in store.load(session)] == [2, 3, 4, 5]
+
+    # Removing after a dump must delete the renumbered id, not the provisional one.
+    wallet.remove(0)
+    assert wallet.find_private_key(clinic) is None
+    wallet.dump(FlaskResponse(), store)
+    assert [id for id, _ in store.load(session)] == [3, 4, 5]
+    assert len(store.load("other")) == 1
+
+    metrics.collector.clear()
+    metrics.instrument()
+
+    try:
+        loaded = load(session)
+        assert decoded() == 0
+
+        assert loaded.find_private_key(individual).public_key.fingerprint == individual.key.public_key.fingerprint
+        assert decoded() == 1
+
+        assert [data.value for data in loaded.find_data(type=DataType.VACCINE, provider=clinic, recipient=individual)] == ["PFIZER"]
+        assert loaded.find_data(provider=individual) == []
+        assert decoded() == 3
+    finally:
+        metrics.uninstrument()
+
+    # A wallet nothing was written to is not saved and sets no cookie.
+    assert loaded.dump(FlaskResponse(), store).headers.getlist("Set-Cookie") == []
+    assert load().dump(FlaskResponse(), store).headers.getlist("Set-Cookie") == []
+
+    loaded.insert(Data(clinic, individual, "MODERNA", DataType.VACCINE))
+    loaded.dump(FlaskResponse(), store)
+    assert [data.value for data in load(session).find_data(type=DataType.VACCINE)] == ["PFIZER", "MODERNA"]
+
+    # Wallets still held in the legacy cookie move into the store and the cookie is expired.
+    legacy = Wallet([clinic.key])
+    wallet = Wallet.load(FlaskRequest.from_values(headers={"Cookie": f"wallet={legacy.serialize()}"}), store)
+    cookies = wallet.dump(FlaskResponse(), store).headers.getlist("Set-Cookie")
+    assert any(cookie.startswith("wallet=;") for cookie in cookies)
+    assert load(wallet.session).find_private_key(clinic) is not None
+
+
+def test_encodings():
+    print("Encodings\n")
+
+    auth490 = Authority(
+        name="Auth490",
+        key=RSAPrivateKey.generate()
+    )
+    pharmacy = Authority(
+        name="Pharmacy",
+        key=P256PrivateKey.generate()
+    )
+    individual = Individual(
+        key=Ed25519PrivateKey.generate()
+    )
+
+    datas = [Data(pharmacy, individual, value, DataType.VACCINE) for value in ["PFIZER", "MODERNA"]]
+    transfer = DataTransfer(individual, datas, "TEST")
+    transfer.sign(individual)
+    request = PermissionRequest(pharmacy, [PermissionType.DATA_CREATION])
+
+    payloads = [
+        transfer,
+        request,
+        PermissionApproval(auth490, request.permissions, request),
+        DataRequest(individual, [DataType.NAME, DataType.VACCINE], "1234"),
+        Revocation(pharmacy, datas[0]),
+        auth490.key,
+        individual.key.public_key
+    ]
+
+    metrics.collector.clear()
+    metrics.instrument()
+
+    try:
+        for payload in payloads:
+            for binary_encoding, key_table, dictionary in itertools.product([False, True], repeat=3):
+                serialized = payload.serialize(binary_encoding=binary_encoding, key_table=key_table, dictionary=dictionary)
+                header = serialized.split(":", 1)[0].split(".")
+
+                assert ("B1" in header) == binary_encoding
+                assert ("Z1" in header) == (dictionary and (binary_encoding or isinstance(payload.fragment(), dict)))
+
+                decoded = deserialize(serialized)
+                assert type(decoded) is type(payload)
+                assert decoded.serialize() == payload.serialize()
+
+            print(payload.__class__.__name__, len(payload.serialize()), "->", len(payload.serialize(binary_encoding=True, key_table=True, dictionary=True)))
+
+        assert deserialize(transfer.serialize(key_table=True)).validate()
+
+        # The pharmacy and the individual appear in every Data, the table stores them once.
+        packed = pack_key_table(transfer.fragment())
+        assert len(packed["h"]) == 2
+        assert dumps(unpack_key_table(packed)) == dumps(transfer.fragment())
+
+        rendered = metrics.collector.render()
+    finally:
+        metrics.uninstrument()
+
+    assert not metrics.is_enabled()
+    assert 'auth490_call_seconds_count{operation="deserialize"} ' + str(len(payloads) * 8 + 1) in rendered
+    assert 'auth490_payload_bytes_count{operation="deserialize"}' in rendered
 
 
 if __name__ == "__main__":
     test()
+    test_key_holder_resolvers()
+    test_registry_restore()
+    test_revocations()
+    test_batch_inserts()
+    test_membership_proofs()
+    test_deferred_signing()
+    test_transfer_verification()
+    test_wallet_store()
+    test_encodings()
@@ -0,0 +1,123 @@
+from auth490 import *
+from auth490.dictionaries import DICTIONARIES
+from auth490.serialize import decode, dumps, pack_key_table
+from collections import Counter
+from typing import List
+import argparse
+import random
+import re
+
+# Base64 keys, signatures and digit payloads never repeat across payloads.
+RANDOM_RUN = re.compile(rb"[A-Za-z0-9_-]{24,}={0,2}")
+
+def synthesize(count: int) -> List[dict]:
+    keys = [RSAPrivateKey.generate() for _ in range(8)]
+    names = ["Government", "Hospital", "Pharmacy", "Clinic", "University"]
+    values = ["JOHN DOE", "JANE DOE", "PFIZER", "MODERNA", "ASTRAZENECA"]
+    samples = []
+
+    main_authority = Authority(name="Auth490", key=keys[0])
+
+    while len(samples) < count:
+        authority = Authority(name=random.choice(names), key=random.choice(keys))
+        individual = Individual(key=random.choice(keys))
+
+        authority_request = AuthorityRequest(main_authority, authority)
+        permission_request = PermissionRequest(authority, random.sample(list(PermissionType), random.randint(1, len(PermissionType))))
+        datas = [Data(authority, individual, random.choice(values), random.choice(list(DataType))) for _ in range(random.randint(1, 5))]
+        transfer = DataTransfer(individual, datas, str(random.randrange(10000)))
+        transfer.sign(individual)
+
+        payloads = [
+            authority,
+            individual,
+            authority_request,
+            AuthorityApproval(main_authority, authority_request),
+            permission_request,
+            PermissionApproval(main_authority, permission_request.permissions, permission_request),
+            DataRequest(individual, random.sample(list(DataType), random.randint(1, len(DataType))), str(random.randrange(10000))),
+            transfer,
+            *datas
+        ]
+
+        for payload in payloads:
+            samples.append(payload.fragment())
+            samples.append(pack_key_table(payload.fragment()))
+
+    return samples[:count]
+
+def load(path: str) -> List[dict]:
+    samples = []
+
+    with open(path) as h:
+        for line in h:
+            if len(line.strip()) == 0:
+                continue
+
+            _, raw_data = decode(line.strip())
+            if isinstance(raw_data, dict):
+                samples.append(raw_data)
+
+    return samples
+
+def train(samples: List[dict], size: int) -> bytes:
+    frequencies = Counter()
+
+    for sample in samples:
+        fragments = RANDOM_RUN.split(dumps(sample).encode())
+        frequencies.update(set(fragment for fragment in fragments if len(fragment) > 2))
+
+    candidates = sorted(
+        (fragment for fragment, frequency in frequencies.items() if frequency > 1),
+        key=lambda fragment: frequencies[fragment] * len(fragment),
+        reverse=True
+    )
+
+    chosen = []
+    total = 0
+    for fragment in candidates:
+        if total + len(fragment) > size:
+            continue
+        if any(fragment in other for other in chosen):
+            continue
+
+        chosen.append(fragment)
+        total += len(fragment)
+
+    # zlib prefers matches near the end of the dictionary.
+    return b"".join(reversed(chosen))
+
+def write(dictionaries: dict, path: str):
+    with open(path, "w") as h:
+        h.write("# Generated by train_dictionary.py, do not edit. Versions are append-only.\n\n")
+        h.write("DICTIONARIES = {\n")
+
+        for version, dictionary in sorted(dictionaries.items()):
+            h.write(f"    {version}: (\n")
+            for i in range(0, len(dictionary), 64):
+                h.write(f"        {dictionary[i:i + 64]!r}\n")
+            h.write("    ),\n")
+
+        h.write("}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a preset zlib dictionary for auth490 payloads.")
+    parser.add_argument("--corpus", help="File with one serialized payload per line. Synthesized when omitted.")
+    parser.add_argument("--samples", type=int, default=2000, help="Number of synthesized payloads.")
+    parser.add_argument("--size", type=int, default=2048, help="Maximum dictionary size in bytes.")
+    parser.add_argument("--version", type=int, default=max(DICTIONARIES, default=0) + 1)
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing dictionary version.")
+    parser.add_argument("--output", default="auth490/dictionaries.py")
+    args = parser.parse_args()
+
+    if args.version in DICTIONARIES and not args.force:
+        raise Exception(f"Dictionary version {args.version} already exists.")
+
+    samples = load(args.corpus) if args.corpus else synthesize(args.samples)
+    dictionary = train(samples, args.size)
+
+    write({**DICTIONARIES, args.version: dictionary}, args.output)
+    print(f"Dictionary Z{args.version}: {len(dictionary)} bytes from {len(samples)} payloads")
+
+if __name__ == "__main__":
+    main()